@@ -1,31 +1,204 @@
-import ollama
-from pydantic import BaseModel
-from typing import Type
+from __future__ import annotations
 
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Type, TYPE_CHECKING
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
+# ollama, openai and dotenv are imported by the functions that use them, so
+# importing this module stays cheap for runs that end up making no model call.
+if TYPE_CHECKING:
+    from pydantic import BaseModel
 
-import os
-from openai import OpenAI
-from dotenv import load_dotenv
-load_dotenv()
 
+LLM_CACHE_PATH = "llm_cache.db"
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
 
-def OllamaService(prompt: str, schema: Type[BaseModel], model_name: str = "llama3.2"):
-    ollama_client = ollama.Client()
 
+class ResponseCache:
+    """
+    Persistent model-response cache. Entries are keyed on a hash of the model name,
+    options, response schema and the exact messages sent, so an unchanged note
+    costs no inference on a rerun while any edit to it misses. When the stored
+    responses exceed max_bytes the least recently used ones are evicted.
+    """
+
+    def __init__(self, db_path: str = LLM_CACHE_PATH, max_bytes: int = LLM_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            );
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses(last_used)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model_name, messages, options=None, schema=None):
+        payload = json.dumps(
+            {'model': model_name, 'messages': messages, 'options': options, 'schema': schema},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key, model_name, response):
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute("""
+                INSERT OR REPLACE INTO responses (key, model, response, size, last_used)
+                VALUES (?, ?, ?, ?, ?)
+            """, (key, model_name, response, size, time.time()))
+            self._total_bytes += size - (old[0] if old else 0)
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, key):
+        with self._lock:
+            old = self._conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if old:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= old[0]
+                self._conn.commit()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_used LIMIT 100"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': entries,
+            'bytes': self._total_bytes,
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"LLM cache: {s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.0%}), "
+                f"{s['entries']} entries, {s['bytes'] / 1024 / 1024:.1f} MB")
+
+
+# Guards the lazily created shared objects below: scheduler threads may ask for
+# them first, and each must be created only once.
+_init_lock = threading.Lock()
+
+_response_cache = None
+
+def get_response_cache():
+    global _response_cache
+    if _response_cache is None:
+        with _init_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache()
+    return _response_cache
+
+
+_env_loaded = False
+
+def load_env():
+    """Read .env into os.environ once (OPENAI_API_KEY, OLLAMA_HOST, OLLAMA_NUM_PARALLEL...)."""
+    global _env_loaded
+    if not _env_loaded:
+        with _init_lock:
+            if not _env_loaded:
+                from dotenv import load_dotenv
+                load_dotenv()
+                _env_loaded = True
+
+
+_ollama_client = None
+
+def get_ollama_client():
+    """One shared client, and so one HTTP connection pool, for every Ollama call."""
+    global _ollama_client
+    if _ollama_client is None:
+        import ollama
+        load_env()
+        with _init_lock:
+            if _ollama_client is None:
+                _ollama_client = ollama.Client()
+    return _ollama_client
+
+
+def cached_chat(model, messages, format=None, options=None, validate=None):
+    """
+    ollama chat() on the shared client, answered from the response cache when possible.
+    validate(content) runs before a reply is cached; if it raises, the reply isn't
+    kept (a bad cached one is dropped) so the next run asks the model again.
+    """
+    cache = get_response_cache()
+    key = cache.make_key(model, messages, options, format)
+    content = cache.get(key)
+    if content is None:
+        response = get_ollama_client().chat(model=model, messages=messages, format=format, options=options)
+        content = response['message']['content']
+        if validate:
+            validate(content)
+        cache.put(key, model, content)
+    elif validate:
+        try:
+            validate(content)
+        except Exception:
+            cache.delete(key)
+            raise
+    return {'message': {'role': 'assistant', 'content': content}}
+
+
+def OllamaService(prompt: str, schema: Type[BaseModel], model_name: str = "llama3.2"):
     messages = [
         {"role": "system", "content": "You are a helpful Assistant."},
         {"role": "user", "content": f"{prompt} Return the answer as JSON."}
     ]
 
-    response = ollama_client.chat(
+    response = cached_chat(
         model=model_name,
         messages=messages,
         format=schema.model_json_schema(),  # Use the dynamic schema's JSON schema
         options={
             "temperature": 0.2,
             "top_p": 0.5
-        }
+        },
+        # A truncated or malformed reply must not be cached, or every rerun fails on it.
+        validate=schema.model_validate_json
     )
 
     structured_output = schema.model_validate_json(response['message']['content'])
@@ -33,7 +206,126 @@ def OllamaService(prompt: str, schema: Type[BaseModel], model_name: str = "llama
     return structured_output
 
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+class OllamaScheduler:
+    """
+    Keeps up to `max_in_flight` requests running against the local Ollama server
+    so it never idles between calls. Set it to the server's OLLAMA_NUM_PARALLEL
+    (the default when that variable is set in this environment too).
+    Results are handed back in submission order; counters are kept for stats().
+    """
+
+    def __init__(self, max_in_flight: int = None):
+        load_env()
+        self.max_in_flight = max_in_flight or int(os.getenv("OLLAMA_NUM_PARALLEL", "4"))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="ollama")
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def _timed(self, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = func(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.failed += 1
+            raise
+        latency = time.perf_counter() - start
+        with self._lock:
+            self.completed += 1
+            self.total_latency += latency
+            self.max_latency = max(self.max_latency, latency)
+        return result
+
+    def submit_task(self, func, *args, **kwargs):
+        """Run any callable that talks to Ollama on the scheduler. Returns a Future."""
+        with self._lock:
+            self.submitted += 1
+        return self._executor.submit(self._timed, func, *args, **kwargs)
+
+    def submit(self, prompt: str, schema: Type[BaseModel], model_name: str = "llama3.2"):
+        """Structured request, same as OllamaService. Returns a Future."""
+        return self.submit_task(OllamaService, prompt, schema, model_name)
+
+    def submit_chat(self, **chat_kwargs):
+        """Raw ollama chat() request through the response cache. Returns a Future."""
+        return self.submit_task(cached_chat, **chat_kwargs)
+
+    def imap(self, func, items):
+        """
+        Yield (item, future) in input order, each future already finished, while
+        keeping the server busy. At most 2 * max_in_flight items are pending at once,
+        so a generator of notes is never read into memory all at once.
+        """
+        window = deque()
+        for item in items:
+            window.append((item, self.submit_task(func, item)))
+            if len(window) >= 2 * self.max_in_flight:
+                item, future = window.popleft()
+                future.exception()
+                yield item, future
+        while window:
+            item, future = window.popleft()
+            future.exception()
+            yield item, future
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'in_flight': self.submitted - finished,
+                'avg_latency_s': self.total_latency / self.completed if self.completed else 0.0,
+                'max_latency_s': self.max_latency,
+                'throughput_per_min': 60 * self.completed / elapsed if elapsed else 0.0,
+            }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"Ollama: {s['completed']} done, {s['failed']} failed, "
+                f"avg {s['avg_latency_s']:.2f}s, max {s['max_latency_s']:.2f}s, "
+                f"{s['throughput_per_min']:.1f} requests/min")
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+
+_openai_client = None
+
+def get_openai_client():
+    """The OpenAI client, created on first use with the key from .env."""
+    global _openai_client
+    if _openai_client is None:
+        from openai import OpenAI
+        load_env()
+        with _init_lock:
+            if _openai_client is None:
+                _openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _openai_client
+
+def cached_openai_chat(model, messages):
+    """OpenAI chat.completions.create() through the response cache. Returns the reply text."""
+    cache = get_response_cache()
+    key = cache.make_key(model, messages)
+    content = cache.get(key)
+    if content is None:
+        response = get_openai_client().chat.completions.create(model=model, messages=messages)
+        content = response.choices[0].message.content
+        cache.put(key, model, content)
+    return content
 
 def OpenAIService(prompt: str, schema: Type[BaseModel], model_name: str = "gpt-4o-2024-08-06"):
     mmessages = [
@@ -47,12 +339,23 @@ def OpenAIService(prompt: str, schema: Type[BaseModel], model_name: str = "gpt-4
         }
     ]
     
-    response = client.beta.chat.completions.parse(
+    cache = get_response_cache()
+    key = cache.make_key(model_name, mmessages, None, schema.model_json_schema())
+    cached = cache.get(key)
+    if cached is not None:
+        try:
+            return schema.model_validate_json(cached)
+        except ValueError:
+            # Stored under an older version of the schema; ask again.
+            cache.delete(key)
+
+    response = get_openai_client().beta.chat.completions.parse(
         model=model_name,
         messages=mmessages,
         response_format=schema,
     )
 
     structured_result = response.choices[0].message.parsed
+    cache.put(key, model_name, structured_result.model_dump_json())
     print(structured_result)
     return structured_result
@@ -1,16 +1,10 @@
 import os
 import sqlite3
-import xml.etree.ElementTree as ET
 from datetime import datetime
 import logging
 
-# Set up logging to file.
-logging.basicConfig(
-    filename='app.log',          # Log file name
-    filemode='a',                # Append mode (use 'w' to overwrite)
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    level=logging.INFO           # Minimum log level to capture
-)
+from md_search.fts_index import initialize_fts, sync_fts
+from md_sqlite.enex_import import initialize_enex_table, import_enex_dir, lookup_note_created
 
 def initialize_db(db_path="files.db"):
     """Initialize the SQLite database and create the table if it doesn't exist."""
@@ -45,6 +39,21 @@ def add_updated_column(db_path="obsidian_index.db"):
     conn.close()
 
 
+def add_scan_columns(conn):
+    """Add the stat columns used by the incremental scanner if they are missing."""
+    cursor = conn.cursor()
+
+    cursor.execute("PRAGMA table_info(files)")
+    existing_columns = [row[1] for row in cursor.fetchall()]
+
+    for column, column_type in (("mtime", "REAL"), ("size", "INTEGER"), ("inode", "INTEGER")):
+        if column not in existing_columns:
+            cursor.execute(f"ALTER TABLE files ADD COLUMN {column} {column_type}")
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_path ON files(path)")
+    conn.commit()
+
+
 # def compute_file_hash(file_path):
 #     """Compute SHA256 hash of the file's contents."""
 #     sha256 = hashlib.sha256()
@@ -69,144 +78,162 @@ def get_existing_files(conn):
             existing[file_hash] = {'id': file_id, 'path': path, 'name': name}
     return existing
 
-def get_note_created_date(md_filepath):
-    """
-    Given the full path of a Markdown file in "4. Archives", this function:
-      - Extracts the folder name after 'Evernote' if present, or immediately after '4. Archives' otherwise.
-      - Constructs the corresponding .enex filename from that folder name.
-      - Searches the .enex file for a note with a <title> matching the Markdown file's base name.
-      - Returns the note's <created> date in the format "YYYY-MM-DD HH:MM:SS".
-    
-    If the .enex file is not found or no matching note is located, it falls back to the file's creation date.
+def get_note_created_date(md_filepath, conn):
     """
-    folder_name = None
-    if "Evernote" in md_filepath:
-        parts = md_filepath.split("Evernote")
-        remainder = parts[1].lstrip(os.sep)
-        folder_name = remainder.split(os.sep)[0]
-    elif "4. Archives" in md_filepath:
-        parts = md_filepath.split("4. Archives")
-        remainder = parts[1].lstrip(os.sep)
-        folder_name = remainder.split(os.sep)[0]
-    else:
-        # Fallback if neither Evernote nor 4. Archives is in the path.
-        return datetime.fromtimestamp(os.path.getctime(md_filepath)).strftime("%Y-%m-%d %H:%M:%S")
-
-    base_name = os.path.splitext(os.path.basename(md_filepath))[0]
-    enex_search_dir = "/Users/bogle/Dev/Agent/markDownSearch/drive-download/"
-    enex_filename = f"{folder_name}.enex"
-    enex_filepath = os.path.join(enex_search_dir, enex_filename)
+    Given the full path of a Markdown file in "4. Archives", look up the note's <created>
+    date in the enex_notes table (filled once by md_sqlite.enex_import) and return it
+    in the format "YYYY-MM-DD HH:MM:SS".
 
-    try:
-        tree = ET.parse(enex_filepath)
-    except FileNotFoundError:
-        logging.error(f"File Not Found Error for {md_filepath}")
+    If no matching note is found, it falls back to the file's creation date.
+    """
+    created = lookup_note_created(conn, md_filepath)
+    if created is None:
+        logging.info(f"No Evernote note found for {md_filepath}")
         return datetime.fromtimestamp(os.path.getctime(md_filepath)).strftime("%Y-%m-%d %H:%M:%S")
+    return created.strftime("%Y-%m-%d %H:%M:%S")
 
-    root = tree.getroot()
-
-    for note in root.findall("note"):
-        title_elem = note.find("title")
-        if title_elem is not None and title_elem.text.strip() == base_name:
-            created_elem = note.find("created")
-            if created_elem is not None:
-                created_str = created_elem.text.strip()  # e.g., "20230609T185031Z"
-                dt = datetime.strptime(created_str, "%Y%m%dT%H%M%SZ")
-                return dt.strftime("%Y-%m-%d %H:%M:%S")
-
-    # Fallback if no matching note is found
-    return datetime.fromtimestamp(os.path.getctime(md_filepath)).strftime("%Y-%m-%d %H:%M:%S")
-
-def add_file(conn, file_path):
-    """Add a new file or update an existing one if renamed."""
+def get_date_created(conn, file_path):
+    """Creation date for a new row, taken from the Evernote export for archived notes."""
+    if "4. Archives" in file_path:
+        return get_note_created_date(file_path, conn)
+    return datetime.fromtimestamp(os.path.getctime(file_path)).strftime("%Y-%m-%d %H:%M:%S")
+
+def walk_markdown_files(directory, allowed_dirs):
+    """Yield (path, stat_result) for every .md file under the allowed top-level folders."""
+    stack = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name in allowed_dirs and entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(".md") and entry.is_file(follow_symlinks=False):
+                        yield entry.path, entry.stat(follow_symlinks=False)
+        except OSError as e:
+            logging.error(f"Could not scan {current}: {e}")
+
+def scan_vault(conn, directory):
+    """
+    Incrementally sync the files table with the directory.
+      - Unchanged files (same mtime and size) cost a single stat and no writes.
+      - Modified files get their stat columns refreshed.
+      - A missing row whose (inode, size, mtime) reappears under a new path is treated
+        as a rename/move and keeps its id.
+      - Rows whose path no longer exists are marked deleted.
+    All writes happen in one transaction. Returns the paths touched, by kind.
+    """
+    allowed_dirs = {"1. Projects", "2. Areas", "3. Resources", "4. Archives"}
+    add_scan_columns(conn)
+    initialize_enex_table(conn)
     cursor = conn.cursor()
-    file_name = os.path.basename(file_path)
 
-    # Determine date_created based on file location
-    if "4. Archives" in file_path:
-        note_date = get_note_created_date(file_path)
-        date_created = note_date
-    else:
-        date_created = datetime.fromtimestamp(os.path.getctime(file_path)).strftime("%Y-%m-%d %H:%M:%S")
-        
-    cursor.execute("""
-        INSERT INTO files (name, path, date_created, deleted)
-        VALUES (?, ?, ?, 0)
-    """, (file_name, file_path, date_created))
-    conn.commit()
-    logging.info(f"Added new file: {file_path}")
+    cursor.execute("SELECT id, path, mtime, size, inode FROM files WHERE deleted = 0")
+    known = {}
+    duplicate_ids = []
+    for file_id, path, mtime, size, inode in cursor.fetchall():
+        if path in known:
+            # Left over from the old blind INSERT scans.
+            duplicate_ids.append(file_id)
+        else:
+            known[path] = (file_id, mtime, size, inode)
+
+    seen = set()
+    new_files = []
+    modified = []
+    for path, st in walk_markdown_files(directory, allowed_dirs):
+        seen.add(path)
+        row = known.get(path)
+        if row is None:
+            new_files.append((path, st))
+        elif row[1] != st.st_mtime or row[2] != st.st_size:
+            modified.append((row[0], path, st))
+
+    # Rows whose path is gone, by id, and the ones with a full stat indexed by it so a
+    # new path can claim them as renames. Legacy rows without a stat are never matched.
+    missing = {}
+    missing_by_stat = {}
+    for path, (file_id, mtime, size, inode) in known.items():
+        if path not in seen:
+            missing[file_id] = path
+            if None not in (inode, size, mtime):
+                missing_by_stat.setdefault((inode, size, mtime), []).append(file_id)
+
+    result = {'added': [], 'modified': [], 'renamed': [], 'deleted': []}
+    with conn:
+        cursor.executemany(
+            "UPDATE files SET mtime = ?, size = ?, inode = ? WHERE id = ?",
+            [(st.st_mtime, st.st_size, st.st_ino, file_id) for file_id, path, st in modified]
+        )
+        result['modified'] = [path for file_id, path, st in modified]
+
+        for path, st in new_files:
+            candidates = missing_by_stat.get((st.st_ino, st.st_size, st.st_mtime))
+            if candidates:
+                file_id = candidates.pop(0)
+                old_path = missing.pop(file_id)
+                cursor.execute("""
+                    UPDATE files SET name = ?, path = ?, mtime = ?, size = ?, inode = ?
+                    WHERE id = ?
+                """, (os.path.basename(path), path, st.st_mtime, st.st_size, st.st_ino, file_id))
+                result['renamed'].append((old_path, path))
+                logging.info(f"Renamed file: {old_path} -> {path}")
+            else:
+                cursor.execute("""
+                    INSERT INTO files (name, path, date_created, deleted, mtime, size, inode)
+                    VALUES (?, ?, ?, 0, ?, ?, ?)
+                """, (os.path.basename(path), path, get_date_created(conn, path),
+                      st.st_mtime, st.st_size, st.st_ino))
+                result['added'].append(path)
+                logging.info(f"Added new file: {path}")
+
+        deleted_ids = list(missing) + duplicate_ids
+        cursor.executemany("UPDATE files SET deleted = 1 WHERE id = ?", [(i,) for i in deleted_ids])
+        result['deleted'] = list(missing.values())
+        for path in result['deleted']:
+            logging.info(f"Marked file as deleted: {path}")
+
+    return result
 
 def scan_directory(conn, directory):
     """Perform a full scan of the directory for files and process them.
        This function adds new files, updates existing ones, and marks files as deleted if they are no longer found.
     """
-    allowed_dirs = {"1. Projects", "2. Areas", "3. Resources", "4. Archives"}
-    
-    for root_dir, dirs, files in os.walk(directory):
-        relative_root = os.path.relpath(root_dir, directory)
-        if relative_root != ".":
-            top_dir = relative_root.split(os.sep)[0]
-            if top_dir not in allowed_dirs:
-                continue
-        
-        for file in files:
-            if not file.endswith(".md"):
-                continue
-            full_path = os.path.join(root_dir, file)
-            add_file(conn, full_path)
-
-def check_new_files_by_name(conn, directory):
-    """
-    Check for new Markdown files in the directory whose names do not yet exist in the database.
-    Returns a list of full file paths for these new files.
-    """
-    allowed_dirs = {"1. Projects", "2. Areas", "3. Resources", "4. Archives"}
-    cursor = conn.cursor()
-    cursor.execute("SELECT name FROM files WHERE deleted = 0")
-    existing_names = {row[0] for row in cursor.fetchall()}
-    new_files = []
-    
-    for root_dir, dirs, files in os.walk(directory):
-        relative_root = os.path.relpath(root_dir, directory)
-        if relative_root != ".":
-            top_dir = relative_root.split(os.sep)[0]
-            if top_dir not in allowed_dirs:
-                continue
-        
-        for file in files:
-            if file.endswith(".md") and file not in existing_names:
-                new_files.append(os.path.join(root_dir, file))
-    return new_files
+    return scan_vault(conn, directory)
 
 def main():
     db_path = "obsidian_index.db"
     directory_to_scan = "/Users/bogle/Dev/obsidian/Bogle"
     conn = initialize_db(db_path)
-    cursor = conn.cursor()
     print("Start")
-    
-    # Determine if the database has already been scanned.
-    cursor.execute("SELECT COUNT(*) FROM files")
-    count = cursor.fetchone()[0]
-    
-    if count == 0:
-        print("Full Scan")
-        logging.info("No previous scan found, performing a full scan of the directory.")
-        scan_directory(conn, directory_to_scan)
-    else:
-        logging.info("Previous scan detected. Checking only for new files by name.")
-        new_files = check_new_files_by_name(conn, directory_to_scan)
-        if new_files:
-            logging.info(f"Found new files: {new_files}")
-            print(f"Found new files: {new_files}")
-
-            # for file_path in new_files:
-            #     # add_file(conn, file_path)
-        else:
-            logging.info("No new files found.")
+
+    # Cheap when the exports haven't changed: one stat per .enex file.
+    import_enex_dir(conn)
+
+    result = scan_vault(conn, directory_to_scan)
+    summary = ", ".join(f"{len(paths)} {kind}" for kind, paths in result.items())
+    logging.info(f"Scan complete: {summary}")
+    print(f"Scan complete: {summary}")
+
+    # Keep the full-text index in step with the files table.
+    initialize_fts(conn)
+    sync_fts(conn)
     
     print("End")
     conn.close()
 
 if __name__ == '__main__':
+    # Set up logging to file. Only when run as a script, so importing this
+    # module doesn't write app.log into the caller's directory.
+    logging.basicConfig(
+        filename='app.log',          # Log file name
+        filemode='a',                # Append mode (use 'w' to overwrite)
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        level=logging.INFO           # Minimum log level to capture
+    )
     main()
\ No newline at end of file
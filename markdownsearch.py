@@ -0,0 +1,130 @@
+"""
+One entry point for the vault tools:
+
+    python markdownsearch.py <command> [command options]
+
+Each command runs its script as __main__ with the remaining arguments, and only
+then imports what that script needs, so `--help` or a run with nothing to do
+doesn't pay for openai, ollama, pydantic, tiktoken, faiss or sentence-transformers.
+`startup-check` measures that with `python -X importtime` and fails when a module
+on the start-up path pulls in one of them or takes longer than its budget.
+"""
+import os
+import re
+import sys
+import runpy
+import argparse
+import subprocess
+
+# command -> (module run as __main__, help)
+COMMANDS = {
+    "scan": ("filelist_sqliteV3", "Sync the files table and full-text index with the vault"),
+    "tags": ("md_fileagent.tag_daemonv2", "Update the tag index and tags_list.md"),
+    "tag": ("tag_suggestion", "Suggest tags for new and changed notes (--watch to keep running)"),
+    "summarize": ("md_summary.ollamaSummaryv2", "Summarize notes with Ollama"),
+    "links": ("md_links.link_index", "Link index: links per domain, URL and note"),
+    "secrets": ("passwords.secret_scanner", "Find notes containing exported passwords"),
+    "search": ("md_search.hybrid_search", "Hybrid keyword + semantic search"),
+    "embed": ("md_search.embedding_store", "Update or query the note embedding store"),
+    "serve": ("md_search.server", "Run the local query server"),
+}
+
+# Packages that must not be imported just to start up or to find there is nothing to do.
+HEAVY_PACKAGES = {
+    "openai", "ollama", "pydantic", "dotenv", "tiktoken", "git", "faiss", "numpy",
+    "sentence_transformers", "torch", "transformers", "pandas", "watchdog", "selenium",
+}
+
+# Modules whose import is on the start-up path, and their import-time budget in ms.
+STARTUP_MODULES = {
+    "markdownsearch": 50,
+    "ai_service": 100,
+    "tag_suggestion": 300,
+    "filelist_sqliteV3": 150,
+    "md_fileagent.tag_daemonv2": 200,
+    "md_fileagent.prompt_budget": 50,
+    "md_search.fts_index": 150,
+}
+
+importtime_line = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def import_profile(module):
+    """
+    Import module in a fresh interpreter under -X importtime.
+    Returns (cumulative ms for the module, set of top-level packages imported).
+    """
+    root = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=root, env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr.strip().splitlines()[-1]}")
+
+    cumulative_ms = 0.0
+    packages = set()
+    for line in result.stderr.splitlines():
+        match = importtime_line.match(line)
+        if not match:
+            continue
+        name = match.group(4)
+        packages.add(name.split(".")[0])
+        if name == module:
+            cumulative_ms = int(match.group(2)) / 1000
+    return cumulative_ms, packages
+
+
+def startup_check(scale=1.0):
+    """Print the import profile of every start-up module; return False on any regression."""
+    ok = True
+    for module, budget_ms in STARTUP_MODULES.items():
+        try:
+            cumulative_ms, packages = import_profile(module)
+        except RuntimeError as e:
+            print(f"FAIL  {module}: {e}")
+            ok = False
+            continue
+
+        heavy = sorted(packages & HEAVY_PACKAGES)
+        over_budget = cumulative_ms > budget_ms * scale
+        status = "FAIL" if heavy or over_budget else "ok"
+        ok = ok and status == "ok"
+        print(f"{status:<5} {module:<28} {cumulative_ms:7.1f} ms (budget {budget_ms * scale:.0f})"
+              + (f"  imports {', '.join(heavy)}" if heavy else ""))
+    return ok
+
+
+def run_command(command, args):
+    """Run the command's module as if it had been started with `python -m module args`."""
+    module = COMMANDS[command][0]
+    # runpy replaces argv[0] with the module's file, as `python -m` does.
+    sys.argv = [sys.argv[0]] + list(args)
+    runpy.run_module(module, run_name="__main__", alter_sys=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="markdownsearch",
+        description="Obsidian vault tools.",
+        epilog="\n".join(f"  {name:<14}{help_text}" for name, (_, help_text) in COMMANDS.items())
+               + "\n  startup-check Fail if start-up imports heavy packages or exceed their budget",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=list(COMMANDS) + ["startup-check"], metavar="command")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Options for the command (see <command> --help)")
+    args = parser.parse_args(argv)
+
+    if args.command == "startup-check":
+        check_parser = argparse.ArgumentParser(prog="markdownsearch startup-check")
+        check_parser.add_argument("--scale", type=float, default=1.0,
+                                  help="Multiply every budget, e.g. 2 on a slow machine")
+        check_args = check_parser.parse_args(args.args)
+        sys.exit(0 if startup_check(check_args.scale) else 1)
+
+    run_command(args.command, args.args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import re
+import argparse
+
+from md_fileagent.prompt_budget import count_tokens, truncate_to_tokens, DEFAULT_ENCODING
+
+frontmatter_pattern = re.compile(r'^---\s*\n(.*?)\n---[ \t]*\n?', re.DOTALL)
+heading_pattern = re.compile(r'^#{1,6}\s+\S')
+fence_pattern = re.compile(r'^\s*(```|~~~)')
+link_pattern = re.compile(r'\[\[[^\]]+\]\]|\[[^\]]+\]\([^)]+\)')
+
+# Relative value of each kind of block when the note doesn't fit.
+SCORES = {
+    "frontmatter": 5.0,
+    "heading": 4.0,
+    "lead": 3.5,          # first paragraph of the note
+    "section_lead": 2.5,  # first paragraph under a heading
+    "tail": 2.0,          # last paragraph, often a conclusion or summary
+    "links": 1.5,         # paragraph with wiki or markdown links
+    "body": 1.0,
+    "code": 0.3,
+}
+GAP_MARKER = "..."
+
+
+def split_blocks(content):
+    """
+    Split a note into blocks: the frontmatter, heading lines, fenced code blocks
+    and blank-line separated paragraphs. Returns a list of (kind, text).
+    """
+    blocks = []
+    body = content
+    frontmatter_match = frontmatter_pattern.match(content)
+    if frontmatter_match:
+        blocks.append(("frontmatter", frontmatter_match.group(0).strip()))
+        body = content[frontmatter_match.end():]
+
+    paragraph = []
+    fence = None
+
+    def flush(kind="body"):
+        if paragraph:
+            text = "\n".join(paragraph).strip()
+            if text:
+                blocks.append((kind, text))
+            paragraph.clear()
+
+    for line in body.splitlines():
+        if fence:
+            paragraph.append(line)
+            if line.strip().startswith(fence):
+                fence = None
+                flush("code")
+            continue
+
+        fence_match = fence_pattern.match(line)
+        if fence_match:
+            flush()
+            fence = fence_match.group(1)
+            paragraph.append(line)
+        elif heading_pattern.match(line):
+            flush()
+            blocks.append(("heading", line.strip()))
+        elif not line.strip():
+            flush()
+        else:
+            paragraph.append(line)
+    flush("code" if fence else "body")
+    return blocks
+
+
+def score_blocks(blocks):
+    """Give every block a score; returns a list of (score, kind, text) in note order."""
+    scored = []
+    seen_paragraph = False
+    after_heading = False
+    last_paragraph = max((i for i, (kind, _) in enumerate(blocks) if kind == "body"), default=None)
+
+    for i, (kind, text) in enumerate(blocks):
+        if kind == "body":
+            if not seen_paragraph:
+                kind = "lead"
+            elif after_heading:
+                kind = "section_lead"
+            elif i == last_paragraph:
+                kind = "tail"
+            elif link_pattern.search(text):
+                kind = "links"
+            seen_paragraph = True
+        after_heading = kind == "heading"
+        scored.append((SCORES[kind], kind, text))
+    return scored
+
+
+def pack_note(content, max_tokens, encoding_name=DEFAULT_ENCODING):
+    """
+    Return the highest-value parts of a note that fit in max_tokens, in their
+    original order, with '...' where something was left out. Notes that already
+    fit are returned unchanged. The best block that doesn't fit whole is cut at
+    the remaining budget rather than dropped.
+    """
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(content, encoding_name) <= max_tokens:
+        return content
+
+    scored = score_blocks(split_blocks(content))
+    separator_tokens = count_tokens("\n\n" + GAP_MARKER + "\n\n", encoding_name)
+    # Higher score first; on ties the earlier block wins.
+    order = sorted(range(len(scored)), key=lambda i: (-scored[i][0], i))
+
+    chosen = {}
+    remaining = max_tokens
+    for i in order:
+        if remaining <= separator_tokens:
+            break
+        text = scored[i][2]
+        tokens = count_tokens(text, encoding_name) + separator_tokens
+        if tokens <= remaining:
+            chosen[i] = text
+            remaining -= tokens
+        elif scored[i][1] not in ("code", "heading"):
+            chosen[i] = truncate_to_tokens(text, remaining - separator_tokens, encoding_name)
+            remaining = 0
+
+    parts = []
+    previous = -1
+    for i in sorted(chosen):
+        if i != previous + 1:
+            parts.append(GAP_MARKER)
+        parts.append(chosen[i])
+        previous = i
+    if previous != len(scored) - 1:
+        parts.append(GAP_MARKER)
+    return "\n\n".join(parts)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Show what a note is packed down to for a token budget.")
+    parser.add_argument("file")
+    parser.add_argument("--tokens", type=int, default=1024)
+    args = parser.parse_args()
+
+    with open(args.file, 'r', encoding='utf-8', errors='replace') as f:
+        note = f.read()
+    packed = pack_note(note, args.tokens)
+    print(packed)
+    print(f"\n-- {count_tokens(note)} tokens packed into {count_tokens(packed)} (budget {args.tokens})")
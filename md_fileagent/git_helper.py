@@ -1,8 +1,10 @@
-from git import Repo
 import os
 
 
 def get_repo(repo_path):
+    # GitPython is only imported once a repo is actually opened.
+    from git import Repo
+
     # Try to initialize the repo
     repo = Repo(repo_path)
 
@@ -0,0 +1,110 @@
+import os
+import time
+import argparse
+from functools import lru_cache, partial
+
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoding(encoding_name=DEFAULT_ENCODING):
+    """Load a tiktoken encoding once per process (tiktoken itself is imported on first use)."""
+    import tiktoken
+    return tiktoken.get_encoding(encoding_name)
+
+
+def count_tokens(text, model=DEFAULT_ENCODING):
+    return len(get_encoding(model).encode(text))
+
+
+def truncate_to_tokens(text, max_tokens, encoding_name=DEFAULT_ENCODING):
+    """Cut text at exactly max_tokens tokens. The text is encoded a single time."""
+    encoding = get_encoding(encoding_name)
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max(0, max_tokens)])
+
+
+def fit_prompt(template, content, max_context_length, completion_tokens,
+               content_key="content", encoding_name=DEFAULT_ENCODING, pack=True, **fields):
+    """
+    Format a str.format template so that prompt + completion fits the context window.
+    The template's own size is measured once with empty content and the content gets
+    the remaining token budget. With pack=True a note that doesn't fit is reduced to
+    its highest-value sections (see context_packer); otherwise it is cut at the budget.
+    Pass content_key=None for templates that take the content as the positional '{}'.
+    Other template fields go in **fields.
+    """
+    def render(text):
+        if content_key is None:
+            return template.format(text, **fields)
+        return template.format(**{content_key: text}, **fields)
+
+    limit = max_context_length - completion_tokens
+    budget = limit - count_tokens(render(""), encoding_name)
+    if pack:
+        # Imported here because context_packer builds on the counters above.
+        from md_fileagent.context_packer import pack_note
+        content = pack_note(content, budget, encoding_name)
+    prompt = render(truncate_to_tokens(content, budget, encoding_name))
+
+    # Tokens can merge differently where the content meets the template,
+    # so trim the odd extra token or two when that happens.
+    excess = count_tokens(prompt, encoding_name) - limit
+    while excess > 0 and budget > 0:
+        budget -= excess
+        prompt = render(truncate_to_tokens(content, budget, encoding_name))
+        excess = count_tokens(prompt, encoding_name) - limit
+
+    return prompt
+
+
+def _legacy_fit_prompt(template, content, max_context_length, completion_tokens):
+    """The old approach, kept for the benchmark: reload the encoding and cut 10% per pass."""
+    import tiktoken
+
+    def legacy_count(text):
+        return len(tiktoken.get_encoding(DEFAULT_ENCODING).encode(text))
+
+    prompt = template.format(content=content)
+    while legacy_count(prompt) + completion_tokens > max_context_length:
+        content = content[:int(len(content) * 0.9)]
+        prompt = template.format(content=content)
+    return prompt
+
+
+def benchmark(directory, limit=200, max_context_length=2048, completion_tokens=150):
+    """Print the average prompt construction time per note: old loop, plain cut and packing."""
+    template = "Analyze the content and suggest 3 relevant tags.\n\nContent:\n{content}\n"
+    notes = []
+    for root, dirs, files in os.walk(directory):
+        for filename in files:
+            if filename.endswith(".md") and len(notes) < limit:
+                with open(os.path.join(root, filename), 'r', encoding='utf-8', errors='replace') as f:
+                    notes.append(f.read())
+
+    if not notes:
+        print(f"No markdown files found in {directory}")
+        return
+
+    get_encoding()  # don't charge the one-time load to the first note
+    builders = (
+        ("legacy", _legacy_fit_prompt),
+        ("truncate", partial(fit_prompt, pack=False)),
+        ("pack", fit_prompt),
+    )
+    for name, builder in builders:
+        start = time.perf_counter()
+        for content in notes:
+            builder(template, content, max_context_length, completion_tokens)
+        elapsed = time.perf_counter() - start
+        print(f"{name:>10}: {elapsed / len(notes) * 1000:8.2f} ms/note over {len(notes)} notes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark prompt construction time per note.")
+    parser.add_argument("directory")
+    parser.add_argument("--limit", type=int, default=200)
+    args = parser.parse_args()
+    benchmark(args.directory, args.limit)
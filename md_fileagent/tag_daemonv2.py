@@ -1,62 +1,18 @@
 import os
 import re
-from pathlib import Path
-import yaml
+import argparse
+import sqlite3
+
+from md_fileagent.yaml_constructor import extract_tags_from_content
+from md_fileagent.tag_sqlite import initialize_tag_index, update_tag_index, get_tag_vocabulary, add_tags
+from filelist_sqliteV3 import scan_vault
 
 def extract_tags_from_file(file_path):
     """Extract tags from the 'tags:' field in a markdown file's frontmatter."""
     try:
         with open(file_path, 'r', encoding='utf-8') as file:
             content = file.read()
-        
-        # Extract the YAML frontmatter between --- markers
-        frontmatter_match = re.search(r'^---\s+(.*?)\s+---', content, re.DOTALL)
-        if not frontmatter_match:
-            return set()
-        
-        frontmatter_text = frontmatter_match.group(1)
-        
-        # Parse the YAML frontmatter
-        try:
-            frontmatter = yaml.safe_load(frontmatter_text)
-            
-            # Check if frontmatter is a dictionary (proper YAML)
-            if not isinstance(frontmatter, dict):
-                return set()
-            
-            # Extract tags from the 'tags' field
-            tags = frontmatter.get('tags', [])
-            
-            # Handle different formats of tags (string, list, etc.)
-            parts = []
-            if isinstance(tags, str):
-                # First split on commas if present; otherwise split on whitespace
-                if ',' in tags:
-                    parts = [tag.strip() for tag in tags.split(',') if tag.strip()]
-                else:
-                    parts = [tag.strip() for tag in tags.split() if tag.strip()]
-            elif isinstance(tags, list):
-                for item in tags:
-                    if isinstance(item, str):
-                        if ',' in item:
-                            parts.extend([tag.strip() for tag in item.split(',') if tag.strip()])
-                        else:
-                            parts.extend([tag.strip() for tag in item.split() if tag.strip()])
-            else:
-                return set()
-            
-            # Further split tokens that contain spaces so that "Agents AI readme" becomes three tags
-            final_tags = set()
-            for part in parts:
-                if ' ' in part:
-                    final_tags.update([tag for tag in part.split() if tag])
-                else:
-                    final_tags.add(part)
-            
-            return final_tags
-            
-        except yaml.YAMLError:
-            return set()
+        return extract_tags_from_content(content)
     except Exception as e:
         print(f"Error processing {file_path}: {str(e)}")
         return set()
@@ -103,55 +59,45 @@ def update_tag_list_file(tag_list_file, all_tags):
     except Exception as e:
         print(f"Error updating tag list file: {str(e)}")
 
-def process_markdown_files(markdown_dir, tag_list_file):
-    """Process all markdown files in directory and update tag list."""
-    all_extracted_tags = set()
-    processed_files = 0
-    skipped_files = 0
-    
-    try:
-        markdown_files = list(Path(markdown_dir).glob('**/*.md'))
-        
-        # Skip the tag list file itself if it's in the markdown directory
-        tag_list_path = Path(tag_list_file).resolve()
-        
-        for file_path in markdown_files:
-            if file_path.resolve() == tag_list_path:
-                continue
-                
-            tags = extract_tags_from_file(file_path)
-            if tags:
-                all_extracted_tags.update(tags)
-                processed_files += 1
-            else:
-                skipped_files += 1
-        
-        # Read existing tags
-        existing_tags = read_existing_tag_list(tag_list_file)
-        
-        # Find new tags that don't exist in the current list
-        new_tags = all_extracted_tags - existing_tags
-        
-        # Update the tag list with all tags (existing + new)
-        if new_tags or not os.path.exists(tag_list_file):
-            all_tags = existing_tags.union(all_extracted_tags)
-            update_tag_list_file(tag_list_file, all_tags)
-        
-        return new_tags, processed_files, skipped_files
-    
-    except Exception as e:
-        print(f"Error processing markdown files: {str(e)}")
-        return set(), 0, 0
+def sync_tag_list_file(tag_list_file, vocabulary):
+    """Write tags_list.md as the existing list plus the vault vocabulary. Returns the tags added."""
+    existing_tags = read_existing_tag_list(tag_list_file)
+    new_tags = set(vocabulary) - existing_tags
+    if new_tags or not os.path.exists(tag_list_file):
+        update_tag_list_file(tag_list_file, existing_tags.union(vocabulary))
+    return new_tags
 
-def start_process():
+def start_process(workers=None, db_path="obsidian_index.db", conn=None, rescan=True):
+    """
+    Bring the tag vocabulary up to date. Pass the connection of a caller that has
+    just run scan_vault with rescan=False to reuse that scan instead of walking the
+    vault again.
+    """
     # Configure these paths for your environment
     markdown_directory = "/Users/bogle/Dev/obsidian/Bogle"
     tag_list_file = "/Users/bogle/Dev/Agent/markDownSearch/md_fileagent/tags_list.md"
-    
-    new_tags, processed_files, skipped_files = process_markdown_files(markdown_directory, tag_list_file)
-    
-    print(f"Processed {processed_files} markdown files with valid tags.")
-    print(f"Skipped {skipped_files} files without valid tags.")
+
+    own_conn = conn is None
+    if own_conn:
+        conn = sqlite3.connect(db_path)
+    try:
+        # Only files whose mtime moved since the last scan are re-parsed.
+        if rescan:
+            scan_vault(conn, markdown_directory)
+        initialize_tag_index(conn)
+        if not get_tag_vocabulary(conn):
+            # First build: start from every tag tags_list.md has collected so far.
+            add_tags(conn, read_existing_tag_list(tag_list_file))
+        files_updated, vocabulary_changed = update_tag_index(conn, workers)
+        print(f"Re-read tags from {files_updated} changed markdown files.")
+
+        if vocabulary_changed or not os.path.exists(tag_list_file):
+            new_tags = sync_tag_list_file(tag_list_file, get_tag_vocabulary(conn))
+        else:
+            new_tags = set()
+    finally:
+        if own_conn:
+            conn.close()
     
     if new_tags:
         print(f"Added {len(new_tags)} new tags: {', '.join(sorted(new_tags))}")
@@ -160,4 +106,7 @@ def start_process():
 
 
 if __name__ == "__main__":
-    start_process()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Collect frontmatter tags into tags_list.md.")
+    parser.add_argument("--workers", type=int, default=None, help="Reader processes (default: CPU count)")
+    args = parser.parse_args()
+    start_process(args.workers)
@@ -2,18 +2,28 @@
 
 
 import re
+import sqlite3
 
-def tag_list():
-    # Read the markdown file containing tags
-    with open("/Users/bogle/Dev/Agent/markDownSearch/md_fileagent/tags_list.md", "r") as f:
-        md_content = f.read()
+from md_fileagent.tag_sqlite import get_tag_vocabulary
 
-    # Extract tags that start with '#'
-    # This regex finds any non‑whitespace characters following a '#'
-    tags = re.findall(r"#\S+", md_content)
+def tag_list(db_path="obsidian_index.db"):
+    # The vocabulary is kept in SQLite by tag_daemonv2.start_process
+    conn = sqlite3.connect(db_path)
+    try:
+        tags = [f"#{tag}" for tag in get_tag_vocabulary(conn)]
+    except sqlite3.OperationalError:
+        tags = []
+    finally:
+        conn.close()
 
-    # remove duplicates and sort them
-    tags = sorted(set(tags))
+    if not tags:
+        # Index not built yet, fall back to the markdown file containing tags
+        with open("/Users/bogle/Dev/Agent/markDownSearch/md_fileagent/tags_list.md", "r") as f:
+            md_content = f.read()
+
+        # Extract tags that start with '#'
+        # This regex finds any non‑whitespace characters following a '#'
+        tags = sorted(set(re.findall(r"#\S+", md_content)))
 
     existing_tags_line = "Consider existing tags: " + ", ".join(tags)
 
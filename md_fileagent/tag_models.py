@@ -0,0 +1,11 @@
+from pydantic import BaseModel
+
+
+class TagModel(BaseModel):
+    tag1: str
+    tag2: str
+    tag3: str
+
+class CombinedTagModel(BaseModel):
+    existing_tags: TagModel
+    new_tags: TagModel
@@ -1,19 +1,16 @@
-import tiktoken
+from md_fileagent.prompt_budget import fit_prompt
 
 
-def count_tokens(text, model="cl100k_base"):
-    encoding = tiktoken.get_encoding(model)
-    return len(encoding.encode(text))
+def as_text(content):
+    """Prompt builders are called with a one-element list of note contents."""
+    if isinstance(content, (list, tuple)):
+        return "\n\n".join(content)
+    return content
 
 def tag_prompt(fileName, content, existing_tags_line, count):
     MAX_CONTEXT_LENGTH = 2048
     DESIRED_COMPLETION_TOKENS = 150
 
-    # Function to count tokens using tiktoken
-    def count_tokens(text, model="cl100k_base"):
-        encoding = tiktoken.get_encoding(model)
-        return len(encoding.encode(text))
-
     prompt_template = """
     You are a precise tag generator. Analyze the content and suggest {count} relevant tags.
     {existing_tags_line}
@@ -31,29 +28,17 @@ def tag_prompt(fileName, content, existing_tags_line, count):
     {content}
     """
 
-    # Construct the initial prompt with all named parameters.
-    prompt = prompt_template.format(
+    # Pack the most useful sections of the note into the token budget left by the rest of the prompt.
+    prompt = fit_prompt(
+        prompt_template,
+        as_text(content),
+        MAX_CONTEXT_LENGTH,
+        DESIRED_COMPLETION_TOKENS,
         fileName=fileName,
-        content=content,
         existing_tags_line=existing_tags_line,
         count=count
     )
 
-    # Count tokens in the prompt.
-    prompt_tokens = count_tokens(prompt)
-
-    # Truncate content if the combined token count exceeds the maximum context length.
-    while prompt_tokens + DESIRED_COMPLETION_TOKENS > MAX_CONTEXT_LENGTH:
-        truncate_length = int(len(content) * 0.9)
-        content = content[:truncate_length]
-        prompt = prompt_template.format(
-            fileName=fileName,
-            content=content,
-            existing_tags_line=existing_tags_line,
-            count=count
-        )
-        prompt_tokens = count_tokens(prompt)
-
     return prompt
 
 def tag_prompt_oldtags(fileName, content, existing_tags_line, count):
@@ -76,29 +61,17 @@ def tag_prompt_oldtags(fileName, content, existing_tags_line, count):
     Return your answer strictly as JSON.
     """
 
-    # Construct the initial prompt with all named parameters.
-    prompt = prompt_template.format(
+    # Pack the most useful sections of the note into the token budget left by the rest of the prompt.
+    prompt = fit_prompt(
+        prompt_template,
+        as_text(content),
+        MAX_CONTEXT_LENGTH,
+        DESIRED_COMPLETION_TOKENS,
         fileName=fileName,
-        content=content,
         existing_tags_line=existing_tags_line,
         count=count
     )
 
-    # Count tokens in the prompt.
-    prompt_tokens = count_tokens(prompt)
-
-    # Truncate content if the combined token count exceeds the maximum context length.
-    while prompt_tokens + DESIRED_COMPLETION_TOKENS > MAX_CONTEXT_LENGTH:
-        truncate_length = int(len(content) * 0.9)
-        content = content[:truncate_length]
-        prompt = prompt_template.format(
-            fileName=fileName,
-            content=content,
-            existing_tags_line=existing_tags_line,
-            count=count
-        )
-        prompt_tokens = count_tokens(prompt)
-
     return prompt
 
 def new_tag_prompt(fileName, content, count):
@@ -118,27 +91,16 @@ def new_tag_prompt(fileName, content, count):
     {content}
     """
 
-    # Construct the initial prompt with all named parameters.
-    prompt = prompt_template.format(
+    # Pack the most useful sections of the note into the token budget left by the rest of the prompt.
+    prompt = fit_prompt(
+        prompt_template,
+        as_text(content),
+        MAX_CONTEXT_LENGTH,
+        DESIRED_COMPLETION_TOKENS,
         fileName=fileName,
-        content=content,
         count=count
     )
 
-    # Count tokens in the prompt.
-    prompt_tokens = count_tokens(prompt)
-
-    # Truncate content if the combined token count exceeds the maximum context length.
-    while prompt_tokens + DESIRED_COMPLETION_TOKENS > MAX_CONTEXT_LENGTH:
-        truncate_length = int(len(content) * 0.9)
-        content = content[:truncate_length]
-        prompt = prompt_template.format(
-            fileName=fileName,
-            content=content,
-            count=count
-        )
-        prompt_tokens = count_tokens(prompt)
-
     return prompt
 
 def new_tag_promptv2(fileName, content, count):
@@ -165,23 +127,60 @@ def new_tag_promptv2(fileName, content, count):
     Content:
     {content}
     """
-    prompt = prompt_template.format(
+    # Pack the most useful sections of the note into the token budget left by the rest of the prompt.
+    prompt = fit_prompt(
+        prompt_template,
+        as_text(content),
+        MAX_CONTEXT_LENGTH,
+        DESIRED_COMPLETION_TOKENS,
         fileName=fileName,
-        content=content,
         count=count
     )
 
-    prompt_tokens = count_tokens(prompt)
+    return prompt
+
+def combined_tag_prompt(fileName, content, existing_tags_line, count):
+    MAX_CONTEXT_LENGTH = 2048
+    DESIRED_COMPLETION_TOKENS = 200
+
+    prompt_template = """
+    Given the file "{fileName}" with the following content:
+    \"\"\"
+    {content}
+    \"\"\"
 
-    # Truncate content if the combined token count exceeds the maximum context length.
-    while prompt_tokens + DESIRED_COMPLETION_TOKENS > MAX_CONTEXT_LENGTH:
-        truncate_length = int(len(content) * 0.9)
-        content = content[:truncate_length]
-        prompt = prompt_template.format(
-            fileName=fileName,
-            content=content,
-            count=count
-        )
-        prompt_tokens = count_tokens(prompt)
+    Answer with two groups of {count} tags.
+
+    existing_tags: select tags **only from the following list**.
+    Do not invent any new tags or modify the given tags.
+    The tags you choose must match exactly (including case and punctuation) the ones provided in the list:
+    {existing_tags_line}
+    If none of these tags have an evident link to the main topics, use "null" for them.
 
-    return prompt
\ No newline at end of file
+    new_tags: suggest new tags for the content.
+    1. One tag reflecting the topic or platform
+    2. One tag indicating the document type (e.g., meeting_notes, research, brainstorm, draft).
+    3. One more specific tag inspired by the file name
+    4. Use hyphens for multi-word tags.
+    5. Ensure tags are concise and reusable across notes.
+    6. Do not suggest tags that are already present in the content.
+
+    Examples:
+    - Use moderately broad tags like fitnessPlan, not overly specific like monday_dumbells_20kg.
+    - For "humility and leadership", use humility.
+
+    Return your answer strictly as JSON.
+    """
+
+    # Pack the most useful sections of the note into the token budget left by the rest of the prompt.
+    prompt = fit_prompt(
+        prompt_template,
+        as_text(content),
+        MAX_CONTEXT_LENGTH,
+        DESIRED_COMPLETION_TOKENS,
+        fileName=fileName,
+        existing_tags_line=existing_tags_line,
+        count=count
+    )
+
+    return prompt
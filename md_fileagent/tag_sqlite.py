@@ -3,6 +3,8 @@ import os
 from datetime import datetime
 import json
 
+from md_fileagent.vault_reader import read_vault
+
 def initialize_db(db_path="obsidian_index.db"):
     conn = sqlite3.connect(db_path)
     return conn
@@ -129,4 +131,91 @@ def select_all_db( db_path="obsidian_index.db"):
     cursor = conn.cursor()
     cursor.execute("SELECT path FROM files WHERE deleted = 0")
     existing_files = {row[0] for row in cursor.fetchall()}
-    return existing_files
\ No newline at end of file
+    return existing_files
+
+
+def initialize_tag_index(conn):
+    """Create the normalized tags/file_tags tables and keep them in line with the files table."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS tags (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tag TEXT NOT NULL UNIQUE
+        );
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS file_tags (
+            file_id INTEGER NOT NULL,
+            tag_id INTEGER NOT NULL,
+            PRIMARY KEY (file_id, tag_id)
+        );
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_tags_tag ON file_tags(tag_id)")
+
+    cursor.execute("PRAGMA table_info(files)")
+    existing_columns = [row[1] for row in cursor.fetchall()]
+    if "tags_mtime" not in existing_columns:
+        cursor.execute("ALTER TABLE files ADD COLUMN tags_mtime REAL")
+
+    cursor.executescript("""
+        CREATE TRIGGER IF NOT EXISTS file_tags_delete AFTER DELETE ON files BEGIN
+            DELETE FROM file_tags WHERE file_id = old.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS file_tags_mark_deleted AFTER UPDATE OF deleted ON files
+        WHEN new.deleted = 1 BEGIN
+            DELETE FROM file_tags WHERE file_id = old.id;
+            UPDATE files SET tags_mtime = NULL WHERE id = old.id;
+        END;
+    """)
+    conn.commit()
+
+
+def get_tag_vocabulary(conn):
+    """
+    Return every tag seen in the vault, sorted. Like tags_list.md, the vocabulary
+    keeps tags that no note uses any more.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT tag FROM tags ORDER BY tag")
+    return [row[0] for row in cursor.fetchall()]
+
+
+def add_tags(conn, tags):
+    """Add tags to the vocabulary without attaching them to any file."""
+    with conn:
+        conn.executemany("INSERT OR IGNORE INTO tags (tag) VALUES (?)", [(tag,) for tag in tags])
+
+
+def update_tag_index(conn, workers=None):
+    """
+    Re-read frontmatter tags only for files whose mtime changed since they were last
+    indexed (files.mtime is kept by the incremental scanner).
+    Returns (files_updated, vocabulary_changed).
+    """
+    cursor = conn.cursor()
+    vocabulary_before = get_tag_vocabulary(conn)
+
+    cursor.execute("""
+        SELECT id, path FROM files
+        WHERE deleted = 0 AND (mtime IS NULL OR tags_mtime IS NULL OR tags_mtime <> mtime)
+    """)
+    rows = cursor.fetchall()
+
+    files_updated = 0
+    notes = read_vault([path for file_id, path in rows], workers=workers, hash_content=False, parse_tags=True)
+    with conn:
+        for (file_id, path), note in zip(rows, notes):
+            if note['error']:
+                print(f"Error processing {path}: {note['error']}")
+                continue
+            cursor.execute("DELETE FROM file_tags WHERE file_id = ?", (file_id,))
+            for tag in note['tags']:
+                cursor.execute("INSERT OR IGNORE INTO tags (tag) VALUES (?)", (tag,))
+                cursor.execute("""
+                    INSERT OR IGNORE INTO file_tags (file_id, tag_id)
+                    SELECT ?, id FROM tags WHERE tag = ?
+                """, (file_id, tag))
+            cursor.execute("UPDATE files SET tags_mtime = ? WHERE id = ?", (note['mtime'], file_id))
+            files_updated += 1
+
+    return files_updated, get_tag_vocabulary(conn) != vocabulary_before
@@ -0,0 +1,135 @@
+import os
+import time
+import queue
+import logging
+import threading
+
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+
+
+class NoteEventHandler(FileSystemEventHandler):
+    """Forwards filesystem events for markdown notes to the TagWatcher."""
+
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.watcher.touch(event.src_path, created=True)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.watcher.touch(event.src_path)
+
+    def on_moved(self, event):
+        # Editors often save by writing a temp file and renaming it over the note.
+        if not event.is_directory:
+            self.watcher.touch(event.dest_path)
+
+
+class TagWatcher:
+    """
+    Long-running tagger: subscribes to filesystem events under the vault (inotify on
+    Linux, FSEvents on macOS), waits until a note has been quiet for `debounce_seconds`
+    so a burst of editor saves becomes one job, and hands each note to `on_note`
+    on a single worker thread. Writes made by `on_note` itself are recognised by
+    their mtime and ignored.
+    """
+
+    def __init__(self, directory, on_note, allowed_dirs=None, debounce_seconds=2.0):
+        self.directory = os.path.abspath(directory)
+        self.on_note = on_note
+        self.allowed_dirs = allowed_dirs
+        self.debounce_seconds = debounce_seconds
+
+        self._lock = threading.Lock()
+        self._pending = {}      # path -> (last event time, created)
+        self._queued = set()
+        self._own_writes = {}   # path -> st_mtime_ns right after on_note wrote it
+        self._queue = queue.Queue()
+        self._stop = threading.Event()
+
+    def is_note(self, path):
+        if not path.endswith(".md"):
+            return False
+        relative = os.path.relpath(path, self.directory)
+        parts = relative.split(os.sep)
+        if parts[0] == ".." or any(part.startswith(".") for part in parts):
+            return False
+        return self.allowed_dirs is None or parts[0] in self.allowed_dirs
+
+    def touch(self, path, created=False):
+        """Record an event for path; the debounce loop decides when to enqueue it."""
+        if not self.is_note(path):
+            return
+        with self._lock:
+            previous = self._pending.get(path)
+            self._pending[path] = (time.monotonic(), created or (previous is not None and previous[1]))
+
+    def _is_own_write(self, path):
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return True  # gone again, nothing to tag
+        return self._own_writes.get(path) == mtime_ns
+
+    def _debounce_loop(self):
+        while not self._stop.is_set():
+            now = time.monotonic()
+            with self._lock:
+                ready = [(path, created) for path, (last_event, created) in self._pending.items()
+                         if now - last_event >= self.debounce_seconds]
+                for path, created in ready:
+                    del self._pending[path]
+
+            for path, created in ready:
+                if self._is_own_write(path):
+                    continue
+                with self._lock:
+                    if path in self._queued:
+                        continue
+                    self._queued.add(path)
+                self._queue.put((path, created))
+
+            self._stop.wait(min(0.5, self.debounce_seconds))
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            try:
+                path, created = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self._lock:
+                self._queued.discard(path)
+            try:
+                self.on_note(path, created)
+                self._own_writes[path] = os.stat(path).st_mtime_ns
+            except Exception:
+                logging.exception(f"Failed to tag {path}")
+
+    def run(self):
+        """Watch until interrupted with Ctrl+C."""
+        observer = Observer()
+        observer.schedule(NoteEventHandler(self), self.directory, recursive=True)
+        observer.start()
+
+        threads = [
+            threading.Thread(target=self._debounce_loop, daemon=True),
+            threading.Thread(target=self._worker_loop, daemon=True),
+        ]
+        for thread in threads:
+            thread.start()
+
+        print(f"Watching {self.directory} for note changes...")
+        try:
+            while observer.is_alive():
+                observer.join(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stop.set()
+            observer.stop()
+            observer.join()
+            for thread in threads:
+                thread.join()
@@ -0,0 +1,61 @@
+import os
+import hashlib
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from md_fileagent.yaml_constructor import extract_tags_from_content
+
+
+def default_workers():
+    return os.cpu_count() or 4
+
+
+def read_note(file_path, hash_content=True, parse_tags=False):
+    """
+    Read a file once and return what the SQLite writers need from it:
+    path, size, mtime, sha256 of the raw bytes and the frontmatter tags.
+    'error' is set instead of raising so one bad file doesn't stop a pool.
+    """
+    result = {'path': str(file_path), 'size': None, 'mtime': None, 'hash': None, 'tags': None, 'error': None}
+    try:
+        with open(file_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            data = f.read()
+    except OSError as e:
+        result['error'] = str(e)
+        return result
+
+    result['size'] = st.st_size
+    result['mtime'] = st.st_mtime
+    if hash_content:
+        result['hash'] = hashlib.sha256(data).hexdigest()
+    if parse_tags:
+        result['tags'] = extract_tags_from_content(data.decode('utf-8', errors='replace'))
+    return result
+
+
+def map_files(func, file_paths, workers=None, use_processes=True):
+    """
+    Apply func to every path on a pool and stream the results back in input order.
+    Processes suit CPU-bound parsing (YAML, regex); threads are enough for hashing
+    since hashlib and file reads release the GIL. workers=1 runs inline.
+    func must be a module-level function when use_processes is set.
+    """
+    workers = workers or default_workers()
+    if workers <= 1:
+        for file_path in file_paths:
+            yield func(file_path)
+        return
+
+    file_paths = list(file_paths)
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    # Chunks amortise the inter-process round trip on vaults of small notes.
+    chunksize = max(1, min(64, len(file_paths) // (workers * 4))) if use_processes else 1
+    with executor_class(max_workers=workers) as executor:
+        yield from executor.map(func, file_paths, chunksize=chunksize)
+
+
+def read_vault(file_paths, workers=None, use_processes=True, hash_content=True, parse_tags=False):
+    """Stream read_note results for file_paths, in order, from a pool of workers."""
+    reader = partial(read_note, hash_content=hash_content, parse_tags=parse_tags)
+    return map_files(reader, file_paths, workers, use_processes)
@@ -46,3 +46,59 @@ def create_frontmatter(filename, creation_date_str, writerName, script_run_time_
         "---\n\n"
         f"{content}\n"
     )
+
+
+def extract_tags_from_content(content):
+    """Extract tags from the 'tags:' field in the frontmatter of markdown text."""
+    try:
+        # Extract the YAML frontmatter between --- markers
+        frontmatter_match = re.search(r'^---\s+(.*?)\s+---', content, re.DOTALL)
+        if not frontmatter_match:
+            return set()
+        
+        frontmatter_text = frontmatter_match.group(1)
+        
+        # Parse the YAML frontmatter
+        try:
+            frontmatter = yaml.safe_load(frontmatter_text)
+            
+            # Check if frontmatter is a dictionary (proper YAML)
+            if not isinstance(frontmatter, dict):
+                return set()
+            
+            # Extract tags from the 'tags' field
+            tags = frontmatter.get('tags', [])
+            
+            # Handle different formats of tags (string, list, etc.)
+            parts = []
+            if isinstance(tags, str):
+                # First split on commas if present; otherwise split on whitespace
+                if ',' in tags:
+                    parts = [tag.strip() for tag in tags.split(',') if tag.strip()]
+                else:
+                    parts = [tag.strip() for tag in tags.split() if tag.strip()]
+            elif isinstance(tags, list):
+                for item in tags:
+                    if isinstance(item, str):
+                        if ',' in item:
+                            parts.extend([tag.strip() for tag in item.split(',') if tag.strip()])
+                        else:
+                            parts.extend([tag.strip() for tag in item.split() if tag.strip()])
+            else:
+                return set()
+            
+            # Further split tokens that contain spaces so that "Agents AI readme" becomes three tags
+            final_tags = set()
+            for part in parts:
+                if ' ' in part:
+                    final_tags.update([tag for tag in part.split() if tag])
+                else:
+                    final_tags.add(part)
+            
+            return final_tags
+            
+        except yaml.YAMLError:
+            return set()
+    except Exception as e:
+        print(f"Error extracting tags: {str(e)}")
+        return set()
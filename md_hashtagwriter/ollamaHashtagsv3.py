@@ -1,16 +1,16 @@
 import os
 import re
-import tiktoken
-import ollama
-import numpy as np
-import faiss
-from sentence_transformers import SentenceTransformer
+from collections import deque
+
+from filelist_sqliteV3 import initialize_db, scan_vault
+from md_search.embedding_store import EmbeddingStore
+from md_fileagent.prompt_budget import fit_prompt
+from ai_service import OllamaScheduler, cached_chat, get_response_cache
 
 # 1. Configuration
 input_dir = '/Users/bogle/Dev/obsidian/Bogle'
 allowed_dirs = {"1. Projects", "2. Areas", "3. Resources", "4. Archives"}
 model_name = "llama3.2"
-ollama_client = ollama.Client()
 
 MAX_CONTEXT_LENGTH = 2048
 DESIRED_COMPLETION_TOKENS = 150
@@ -46,149 +46,145 @@ Text to analyze:
 {content}
 """
 
-# 3. Token counting function
-def count_tokens(text, model="cl100k_base"):
-    encoding = tiktoken.get_encoding(model)
-    return len(encoding.encode(text))
-
-# 4. Embedding Model Initialization (using Sentence-Transformers)
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-
-def embed_text(text: str) -> np.ndarray:
-    """Return the embedding vector (float32) for a piece of text."""
-    vector = embedding_model.encode([text], convert_to_numpy=True)
-    return vector.astype('float32')
-
-# 5. FAISS Index Setup
-#    We'll keep an in-memory index, plus a list to store metadata
-faiss_index = None
-stored_metadata = []  # will store tuples of (filename, hashtags, embedding_vector)
-
-def initialize_faiss_index(dimension: int):
-    """Create a new FAISS index with L2 distance."""
-    return faiss.IndexFlatL2(dimension)
-
-def add_to_index(filename: str, hashtags: str, embedding: np.ndarray):
-    """Add a new embedding to the FAISS index and store its metadata."""
-    global faiss_index, stored_metadata
-
-    # If the index is not initialized yet, do so
-    if faiss_index is None:
-        dimension = embedding.shape[1]  # number of dimensions from the embedding
-        faiss_index = initialize_faiss_index(dimension)
-
-    # Add to FAISS
-    faiss_index.add(embedding)
-    # Keep track of metadata
-    stored_metadata.append((filename, hashtags, embedding))
-
-def search_similar(embedding: np.ndarray, top_k=3):
-    """Search FAISS index for top_k similar embeddings."""
-    global faiss_index, stored_metadata
-
-    if faiss_index is None or len(stored_metadata) == 0:
-        # No data in index yet
+# 3. Token budgeting lives in md_fileagent.prompt_budget
+
+# 4. Note embeddings come from the persistent store in md_search.embedding_store:
+#    a rerun only embeds new or changed notes instead of the whole vault.
+db_path = "obsidian_index.db"
+conn = initialize_db(db_path)
+scan_vault(conn, input_dir)
+# HNSW keeps the per-note neighbour lookup sub-millisecond on large vaults
+# ("flat" for exact search; small vaults are searched exactly either way).
+store = EmbeddingStore(conn, index_type="hnsw")
+embedded, removed = store.sync()
+print(f"Embeddings: {embedded} notes embedded, {removed} removed, {len(store)} in the store.")
+
+# 5. Hashtags generated so far, kept per note so later runs can reuse them as references
+conn.execute("""
+    CREATE TABLE IF NOT EXISTS ai_hashtags (
+        file_id INTEGER PRIMARY KEY,
+        hashtags TEXT
+    );
+""")
+conn.commit()
+note_hashtags = dict(conn.execute("SELECT file_id, hashtags FROM ai_hashtags").fetchall())
+
+def search_similar(file_id: int, top_k=3):
+    """Return [(filename, hashtags)] for the closest notes that already have hashtags."""
+    vector = store.get_vector(file_id)
+    if vector is None:
         return []
-
-    # Perform search
-    distances, indices = faiss_index.search(embedding, top_k)
-    # Flatten results (since we pass batch size=1)
-    idx_list = indices[0]
-    results = []
-    for i in idx_list:
-        if i < len(stored_metadata):
-            filename, hashtags, stored_vector = stored_metadata[i]
-            results.append((filename, hashtags))
-    return results
+    # Look further than top_k: many neighbours may not have been tagged yet.
+    hits = store.search(vector, top_k=top_k * 10, exclude_ids={file_id})
+    tagged = [(i, note_hashtags[i]) for i, _ in hits if note_hashtags.get(i)][:top_k]
+    paths = store.get_paths([i for i, _ in tagged])
+    return [(os.path.basename(paths.get(i, "")), hashtags) for i, hashtags in tagged]
+
+def add_to_index(file_id: int, hashtags: str):
+    """Record the hashtags of a note so its neighbours can refer to them."""
+    note_hashtags[file_id] = hashtags
+    with conn:
+        conn.execute("INSERT OR REPLACE INTO ai_hashtags (file_id, hashtags) VALUES (?, ?)", (file_id, hashtags))
 
 # 6. Markdown table header
 markdown_table = "| Filename | AI Suggestions |\n|----------|----------------|\n"
 
 # 7. Main loop: Recursively walk through directories
-for root, dirs, files in os.walk(input_dir):
-    # (Optional) If you only want to descend into certain top-level dirs:
-    # if root == input_dir:
-    #     dirs[:] = [d for d in dirs if d in allowed_dirs]
-
-    for filename in files:
-        if not filename.lower().endswith('.md'):
-            continue
-
-        # If a file limit is set and reached, break
-        if file_limit is not None and file_count >= file_limit:
-            break
-
-        file_path = os.path.join(root, filename)
-
-        if os.path.isfile(file_path):
-            with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
-                content = file.read()
-
-            # -- Step A: Embed the current file's text
-            current_embedding = embed_text(content)
-
-            # -- Step B: Retrieve similar documents and gather their hashtags
-            similar_docs = search_similar(current_embedding, top_k=3)
-            similar_hashtags_list = [doc[1] for doc in similar_docs if doc[1]]
-            # Flatten or join them. You might refine how you pass them into the prompt.
-            # For simplicity, we just concatenate them in a single string:
-            combined_hashtags = " ".join(similar_hashtags_list) or "None"
-
-            # -- Step C: Build the prompt with reference to similar hashtags
-            prompt = prompt_template.format(
-                similar_hashtags=combined_hashtags,
-                content=content
-            )
-
-            # Count tokens and possibly truncate content if needed
-            prompt_tokens = count_tokens(prompt)
-            truncated_content = content
-
-            while prompt_tokens + DESIRED_COMPLETION_TOKENS > MAX_CONTEXT_LENGTH:
-                # Truncate content
-                truncate_length = int(len(truncated_content) * 0.9)
-                truncated_content = truncated_content[:truncate_length]
-                prompt = prompt_template.format(
-                    similar_hashtags=combined_hashtags,
-                    content=truncated_content
-                )
-                prompt_tokens = count_tokens(prompt)
-
-            messages = [
-                {
-                    "role": "system", 
-                    "content": "You are a reliable, concise, and compliant assistant who follows the user's instructions and policies."
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-
-            # -- Step D: Get LLM-generated hashtags
-            response = ollama_client.chat(
-                model=model_name,
-                messages=messages,
-                options={
-                    "temperature": 0.2,
-                    "top_p": 0.5
-                }
-            )
-
-            # The LLM returns a response dict; extract the 'message' content
-            summary = response['message']['content'].strip()
-            # Normalize whitespace
-            summary = ' '.join(summary.split())
-            # Fix patterns like "# " => "#"
-            summary = re.sub(r'#\s+', '#', summary)
-
-            # -- Step E: Update the FAISS index with the new file embedding & hashtags
-            add_to_index(filename, summary, current_embedding)
-
-            # -- Step F: Add a row to the Markdown table
-            markdown_table += f"| {filename} | {summary} |\n"
-            file_count += 1
-            print(f"Processed file ({file_count}): {file_path}")
+def generate_hashtags(prompt: str) -> str:
+    """Ask the model for hashtags; runs on a scheduler thread."""
+    messages = [
+        {
+            "role": "system", 
+            "content": "You are a reliable, concise, and compliant assistant who follows the user's instructions and policies."
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+    # -- Step D: Get LLM-generated hashtags
+    response = cached_chat(
+        model=model_name,
+        messages=messages,
+        options={
+            "temperature": 0.2,
+            "top_p": 0.5
+        }
+    )
+
+    # The LLM returns a response dict; extract the 'message' content
+    summary = response['message']['content'].strip()
+    # Normalize whitespace
+    summary = ' '.join(summary.split())
+    # Fix patterns like "# " => "#"
+    summary = re.sub(r'#\s+', '#', summary)
+    return summary
+
+def finish_oldest(pending):
+    """Wait for the oldest in-flight note and record it, keeping output in path order."""
+    global markdown_table, file_count
+    file_id, filename, file_path, future = pending.popleft()
+    try:
+        summary = future.result()
+    except Exception as e:
+        print(f"Error generating hashtags for {file_path}: {e}")
+        return
+
+    # -- Step E: Store the hashtags for the notes that come after it
+    add_to_index(file_id, summary)
+
+    # -- Step F: Add a row to the Markdown table
+    markdown_table += f"| {filename} | {summary} |\n"
+    file_count += 1
+    print(f"Processed file ({file_count}): {file_path}")
+
+# Up to scheduler.max_in_flight notes are with the model at once. Similar-note
+# hashtags can only come from notes whose answers are already back, so a note
+# doesn't see the few notes just ahead of it that are still in flight.
+scheduler = OllamaScheduler()
+pending = deque()
+submitted = 0
+
+cursor = conn.cursor()
+cursor.execute("SELECT id, name, path FROM files WHERE deleted = 0 ORDER BY path")
+for file_id, filename, file_path in cursor.fetchall():
+    # If a file limit is set and reached, break
+    if file_limit is not None and submitted >= file_limit:
+        break
+
+    if os.path.isfile(file_path):
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as file:
+            content = file.read()
+
+        # -- Step A/B: Retrieve similar documents from the store and gather their hashtags
+        similar_docs = search_similar(file_id, top_k=3)
+        similar_hashtags_list = [doc[1] for doc in similar_docs if doc[1]]
+        # Flatten or join them. You might refine how you pass them into the prompt.
+        # For simplicity, we just concatenate them in a single string:
+        combined_hashtags = " ".join(similar_hashtags_list) or "None"
+
+        # -- Step C: Build the prompt with reference to similar hashtags,
+        #    packing the most useful sections into the token budget
+        prompt = fit_prompt(
+            prompt_template,
+            content,
+            MAX_CONTEXT_LENGTH,
+            DESIRED_COMPLETION_TOKENS,
+            similar_hashtags=combined_hashtags
+        )
+
+        pending.append((file_id, filename, file_path, scheduler.submit_task(generate_hashtags, prompt)))
+        submitted += 1
+        if len(pending) >= scheduler.max_in_flight:
+            finish_oldest(pending)
+
+while pending:
+    finish_oldest(pending)
+print(scheduler.format_stats())
+print(get_response_cache().format_stats())
+scheduler.shutdown()
+conn.close()
 
 # 8. Write the Markdown table to the output file
 with open(output_file, 'w', encoding='utf-8') as md_file:
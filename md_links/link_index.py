@@ -0,0 +1,227 @@
+import os
+import re
+import mmap
+import time
+import sqlite3
+import logging
+import argparse
+from functools import lru_cache
+from urllib.parse import urlsplit, urlunsplit
+
+from md_fileagent.vault_reader import map_files
+
+# Markdown links, autolinks and bare URLs. Runs on the raw bytes of the mapped file;
+# ) ] > end a Markdown link / autolink, | a table cell.
+link_pattern = re.compile(rb'https?://[^\s)\]<>"\'`|]+')
+# Sentence punctuation and emphasis stuck to the end of a bare URL.
+TRAILING_PUNCTUATION = ".,;:!?*_~"
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def initialize_links(conn):
+    """Create the links table and the triggers that drop a file's links when it goes away."""
+    cursor = conn.cursor()
+    cursor.executescript("""
+        CREATE TABLE IF NOT EXISTS links (
+            file_id INTEGER NOT NULL,
+            url TEXT NOT NULL,
+            domain TEXT NOT NULL,
+            line INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_links_file ON links(file_id);
+        CREATE INDEX IF NOT EXISTS idx_links_domain ON links(domain);
+    """)
+
+    cursor.execute("PRAGMA table_info(files)")
+    existing_columns = [row[1] for row in cursor.fetchall()]
+    if "links_mtime" not in existing_columns:
+        cursor.execute("ALTER TABLE files ADD COLUMN links_mtime REAL")
+
+    # A rename keeps the id and the content, so the links stay valid.
+    cursor.executescript("""
+        CREATE TRIGGER IF NOT EXISTS files_links_delete AFTER DELETE ON files BEGIN
+            DELETE FROM links WHERE file_id = old.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS files_links_mark_deleted AFTER UPDATE OF deleted ON files
+        WHEN new.deleted = 1 BEGIN
+            DELETE FROM links WHERE file_id = old.id;
+            UPDATE files SET links_mtime = NULL WHERE id = old.id;
+        END;
+    """)
+    conn.commit()
+
+
+# The same URLs come back in note after note.
+@lru_cache(maxsize=65536)
+def normalize_url(url):
+    """
+    Return (url, domain) with the scheme and host lower-cased, default ports and
+    fragments dropped and trailing punctuation removed, or None if there is no host.
+    The domain is the host without a leading "www.".
+    """
+    url = url.rstrip(TRAILING_PUNCTUATION)
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname
+        port = parts.port
+    except ValueError:
+        return None
+    if not host:
+        return None
+
+    scheme = parts.scheme.lower()
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+    normalized = urlunsplit((scheme, netloc, parts.path or "/", parts.query, ""))
+    domain = host[4:] if host.startswith("www.") else host
+    return normalized, domain
+
+
+def extract_links(file_path):
+    """
+    Return [(url, domain, line)] for every link in a file, in one pass of the byte
+    regex over the memory-mapped file. Unreadable files give None.
+    """
+    links = []
+    try:
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return links
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                line = 1
+                last = 0
+                for match in link_pattern.finditer(data):
+                    start = match.start()
+                    line += data[last:start].count(b"\n")
+                    last = start
+                    normalized = normalize_url(match.group().decode("utf-8", errors="replace"))
+                    if normalized:
+                        links.append((normalized[0], normalized[1], line))
+    except (OSError, ValueError) as e:
+        logging.error(f"Could not read links from {file_path}: {e}")
+        return None
+    return links
+
+
+def sync_links(conn, workers=None):
+    """
+    Bring the links table up to date with the files table in a single transaction.
+    Only files whose mtime differs from the one recorded when their links were
+    extracted are read again, on a process pool. Returns the number of files (re)read.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(files)")
+    mtime_column = "mtime" if "mtime" in [row[1] for row in cursor.fetchall()] else "NULL"
+    cursor.execute(f"SELECT id, path, {mtime_column}, links_mtime FROM files WHERE deleted = 0")
+
+    stale = []
+    for file_id, file_path, mtime, links_mtime in cursor.fetchall():
+        if mtime is None:
+            try:
+                mtime = os.stat(file_path).st_mtime
+            except OSError:
+                continue
+        if links_mtime != mtime:
+            stale.append((file_id, file_path, mtime))
+
+    extracted = 0
+    with conn:
+        results = map_files(extract_links, [file_path for _, file_path, _ in stale], workers)
+        for (file_id, file_path, mtime), links in zip(stale, results):
+            if links is None:
+                continue
+            cursor.execute("DELETE FROM links WHERE file_id = ?", (file_id,))
+            cursor.executemany(
+                "INSERT INTO links (file_id, url, domain, line) VALUES (?, ?, ?, ?)",
+                [(file_id, url, domain, line) for url, domain, line in links]
+            )
+            cursor.execute("UPDATE files SET links_mtime = ? WHERE id = ?", (mtime, file_id))
+            extracted += 1
+
+        # Drop anything left behind by rows removed outside the triggers.
+        cursor.execute("""
+            DELETE FROM links
+            WHERE file_id NOT IN (SELECT id FROM files WHERE deleted = 0)
+        """)
+
+    logging.info(f"Link index synced, {extracted} files (re)read.")
+    return extracted
+
+
+def domain_counts(conn, limit=None):
+    """[(domain, links, notes)] for the whole vault, most linked first."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT domain, COUNT(*) AS uses, COUNT(DISTINCT file_id) AS notes
+        FROM links
+        GROUP BY domain
+        ORDER BY uses DESC, domain
+        LIMIT ?
+    """, (limit if limit else -1,))
+    return cursor.fetchall()
+
+
+def url_counts(conn, limit=None, domain=None):
+    """[(url, links, notes)], optionally for one domain, most linked first."""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT url, COUNT(*) AS uses, COUNT(DISTINCT file_id) AS notes
+        FROM links
+        {"WHERE domain = ?" if domain else ""}
+        GROUP BY url
+        ORDER BY uses DESC, url
+        LIMIT ?
+    """, ([domain] if domain else []) + [limit if limit else -1])
+    return cursor.fetchall()
+
+
+def notes_linking_to(conn, domain):
+    """[(path, line, url)] for every link to a domain."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT f.path, l.line, l.url
+        FROM links l JOIN files f ON f.id = l.file_id
+        WHERE l.domain = ?
+        ORDER BY f.path, l.line
+    """, (domain,))
+    return cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Link index: every link in the vault with its domain and line.")
+    parser.add_argument("--db", default="obsidian_index.db")
+    parser.add_argument("--sync", action="store_true", help="Scan the vault and re-read new and changed notes first")
+    parser.add_argument("--workers", type=int, default=None, help="Reader processes (default: CPU count)")
+    parser.add_argument("--urls", action="store_true", help="Count full URLs instead of domains")
+    parser.add_argument("--domain", help="Only this domain (with --urls), or list the notes linking to it")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args()
+
+    if args.sync:
+        # Imported here so a report straight from the index doesn't pull in the scanner.
+        from filelist_sqliteV3 import initialize_db, scan_vault
+        conn = initialize_db(args.db)
+        scan_vault(conn, "/Users/bogle/Dev/obsidian/Bogle")
+    else:
+        conn = sqlite3.connect(args.db)
+    initialize_links(conn)
+
+    if args.sync:
+        start = time.perf_counter()
+        extracted = sync_links(conn, args.workers)
+        print(f"Read links from {extracted} notes in {time.perf_counter() - start:.1f}s.")
+
+    if args.urls:
+        for url, uses, notes in url_counts(conn, args.limit, args.domain):
+            print(f"{uses:6d} {notes:6d}  {url}")
+    elif args.domain:
+        for path, line, url in notes_linking_to(conn, args.domain):
+            print(f"{path}:{line}  {url}")
+    else:
+        for domain, uses, notes in domain_counts(conn, args.limit):
+            print(f"{uses:6d} {notes:6d}  {domain}")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
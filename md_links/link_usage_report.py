@@ -1,19 +1,19 @@
 import os
-import re
 from collections import Counter
+import argparse
 import pandas as pd
 
+from md_fileagent.vault_reader import map_files
+from md_links.link_index import extract_links
+
 def extract_links_from_file(file_path):
-    """Extract all links from a Markdown file."""
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    # Regex pattern to match Markdown links and plain URLs
-    link_pattern = r"(https?://[^\s)]+)"
-    return re.findall(link_pattern, content)
-
-def count_links_in_directory(input_dir, allowed_dirs=None):
+    """Extract all links from a Markdown file, normalized as in the link index."""
+    return [url for url, domain, line in extract_links(file_path) or []]
+
+def count_links_in_directory(input_dir, allowed_dirs=None, workers=None):
     """Count links in all Markdown files within a directory."""
     link_counter = Counter()
+    file_paths = []
 
     for root, dirs, files in os.walk(input_dir):
         # Filter allowed directories if specified
@@ -24,8 +24,11 @@ def count_links_in_directory(input_dir, allowed_dirs=None):
             if filename.lower().endswith('.md'):
                 file_path = os.path.join(root, filename)
                 if os.path.isfile(file_path):
-                    links = extract_links_from_file(file_path)
-                    link_counter.update(links)
+                    file_paths.append(file_path)
+
+    # Reading and regex matching is spread over a process pool.
+    for links in map_files(extract_links_from_file, file_paths, workers):
+        link_counter.update(links)
 
     return link_counter
 
@@ -41,12 +44,16 @@ def create_link_usage_table(link_counter, output_file):
     return df
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Count link usage across the vault.")
+    parser.add_argument("--workers", type=int, default=None, help="Reader processes (default: CPU count)")
+    args = parser.parse_args()
+
     input_dir = '/Users/bogle/Dev/obsidian/Bogle'
     allowed_dirs = {"1. Projects", "2. Areas", "3. Resources", "4. Archives"}
 
     
     # Count links in the directory
-    link_counter = count_links_in_directory(input_dir, allowed_dirs)
+    link_counter = count_links_in_directory(input_dir, allowed_dirs, args.workers)
 
     # Define output CSV file path in the same directory as the script
     output_file = os.path.join(os.path.dirname(__file__), 'link_usage_report.csv')
@@ -0,0 +1,470 @@
+import os
+import time
+import queue
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from functools import lru_cache
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import faiss
+
+from md_fileagent.vault_reader import default_workers
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDING_INDEX_PATH = "note_embeddings.faiss"
+# IDMap2 keys every vector by files.id and lets us reconstruct a stored vector.
+INDEX_FACTORY = "IDMap2,Flat"
+BATCH_SIZE = 64
+# Batches are cut from a window this many batches long, sorted by note length.
+SORT_WINDOW = 8
+# Characters kept per model token when clipping notes before encode().
+MAX_CHARS_PER_TOKEN = 8
+
+# Search backends. "flat" searches the stored vectors exactly; the others are
+# approximate indexes built from them and kept in their own file next to it.
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+DEFAULT_INDEX_TYPE = "flat"
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 16
+IVF_REFINE = 8
+# Below this many vectors an approximate index isn't worth building (or training).
+ANN_MIN_VECTORS = 2000
+
+
+@lru_cache(maxsize=None)
+def get_embedding_model(model_name=EMBEDDING_MODEL):
+    """Load a Sentence-Transformers model once per process."""
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name)
+
+
+def read_bytes(file_path):
+    """Raw note contents, or None if the file can't be read."""
+    try:
+        with open(file_path, 'rb') as f:
+            return f.read()
+    except OSError as e:
+        logging.error(f"Could not read {file_path}: {e}")
+        return None
+
+
+def pq_subquantizers(dimension):
+    """PQ code count for about 4 dimensions per 4-bit code; fast-scan needs it to divide d and be even."""
+    for m in range(max(2, dimension // 4), 1, -1):
+        if dimension % m == 0 and m % 2 == 0:
+            return m
+    return 2
+
+
+def build_ann_index(vectors, ids, index_type):
+    """Build an approximate index of type index_type over (vectors, ids)."""
+    count, dimension = vectors.shape
+    if index_type == "hnsw":
+        index = faiss.index_factory(dimension, f"IDMap,HNSW{HNSW_M}")
+        faiss.downcast_index(index.index).hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    elif index_type == "ivfpq":
+        # 4-bit fast-scan PQ codes pick the candidates, and the stored full vectors
+        # re-rank the top k * IVF_REFINE of them (RFlat) to get the recall back.
+        nlist = max(1, min(int(2 * count ** 0.5), count // 39))
+        index = faiss.index_factory(dimension, f"IVF{nlist},PQ{pq_subquantizers(dimension)}x4fs,RFlat")
+        # k-means only needs a few dozen points per list; training on all of a
+        # large vault just costs time.
+        sample = np.random.default_rng(0).choice(count, size=min(count, 64 * nlist), replace=False)
+        index.train(vectors[sample])
+        index = faiss.IndexIDMap(index)
+    else:
+        raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+    index.add_with_ids(vectors, ids)
+    set_search_parameters(index, index_type)
+    return index
+
+
+def set_search_parameters(index, index_type):
+    """Search-time knobs are not stored in the index file, so set them after every load."""
+    if index_type == "hnsw":
+        faiss.downcast_index(index.index).hnsw.efSearch = HNSW_EF_SEARCH
+    elif index_type == "ivfpq":
+        refine = faiss.downcast_index(index.index)
+        refine.k_factor = IVF_REFINE
+        faiss.extract_index_ivf(refine).nprobe = IVF_NPROBE
+
+
+def initialize_embedding_table(conn):
+    """Create the table that maps FAISS ids (files.id) to the content they were embedded from."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS embeddings (
+            file_id INTEGER PRIMARY KEY,
+            content_hash TEXT NOT NULL,
+            mtime REAL,
+            model TEXT NOT NULL,
+            updated REAL
+        );
+    """)
+    conn.commit()
+
+
+class EmbeddingStore:
+    """
+    Note embeddings kept on disk between runs: the vectors live in a FAISS index file
+    keyed by files.id, the embeddings table records the sha256 and mtime each vector
+    was computed from. sync() only reads notes whose mtime changed and only embeds
+    those whose content hash changed. Opened with readonly=True the index file is
+    memory-mapped instead of read into memory, for scripts that only query it.
+    """
+
+    def __init__(self, conn, index_path=EMBEDDING_INDEX_PATH, model_name=EMBEDDING_MODEL, readonly=False,
+                 index_type=DEFAULT_INDEX_TYPE):
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index_type!r}, expected one of {INDEX_TYPES}")
+        self.conn = conn
+        self.index_path = index_path
+        self.model_name = model_name
+        self.readonly = readonly
+        self.index_type = index_type
+        self.ann_path = f"{os.path.splitext(index_path)[0]}.{index_type}.faiss"
+        self.ann = None
+        initialize_embedding_table(conn)
+        self.index = self._load_index(self.index_path)
+
+    def _load_index(self, path):
+        if not os.path.exists(path):
+            return None
+        if self.readonly:
+            try:
+                return faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                # Not every index type can be mapped; fall back to a normal load.
+                logging.info(f"Could not mmap {path}, loading it into memory.")
+        return faiss.read_index(path)
+
+    def search_index(self):
+        """
+        The index searches go to. For "flat" that's the stored vectors themselves.
+        Otherwise the approximate index, loaded from its file when that is newer than
+        the vectors, or rebuilt from them (and saved, unless readonly) when it isn't.
+        """
+        if self.index_type == "flat" or self.index is None or self.index.ntotal < ANN_MIN_VECTORS:
+            return self.index
+        if self.ann is not None:
+            return self.ann
+
+        if (os.path.exists(self.ann_path)
+                and os.path.getmtime(self.ann_path) >= os.path.getmtime(self.index_path)):
+            self.ann = self._load_index(self.ann_path)
+        else:
+            start = time.perf_counter()
+            vectors = self.index.index.reconstruct_n(0, self.index.ntotal)
+            ids = faiss.vector_to_array(self.index.id_map).astype('int64')
+            self.ann = build_ann_index(vectors, ids, self.index_type)
+            logging.info(f"Built {self.index_type} index over {len(ids)} notes "
+                         f"in {time.perf_counter() - start:.1f}s.")
+            if not self.readonly:
+                tmp_path = self.ann_path + ".tmp"
+                faiss.write_index(self.ann, tmp_path)
+                os.replace(tmp_path, self.ann_path)
+        set_search_parameters(self.ann, self.index_type)
+        return self.ann
+
+    def save(self):
+        """Write the index next to its final path and swap it in, so readers never see half a file."""
+        tmp_path = self.index_path + ".tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.index_path)
+
+    def __len__(self):
+        return 0 if self.index is None else self.index.ntotal
+
+    def embed(self, texts, batch_size=BATCH_SIZE):
+        """Embed a list of texts as float32 rows."""
+        model = get_embedding_model(self.model_name)
+        # The model only looks at its first max_seq_length tokens; clipping long
+        # notes first saves tokenizing text that would be thrown away.
+        max_chars = getattr(model, "max_seq_length", 256) * MAX_CHARS_PER_TOKEN
+        vectors = model.encode(
+            [text[:max_chars] for text in texts], batch_size=batch_size, convert_to_numpy=True
+        )
+        return np.asarray(vectors, dtype='float32')
+
+    def _ensure_index(self, dimension):
+        if self.index is None:
+            self.index = faiss.index_factory(dimension, INDEX_FACTORY)
+
+    def _reset(self):
+        """Drop every stored vector, e.g. after switching embedding models."""
+        self.index = None
+        self.ann = None
+        for path in (self.index_path, self.ann_path):
+            if os.path.exists(path):
+                os.remove(path)
+        with self.conn:
+            self.conn.execute("DELETE FROM embeddings")
+
+    def _read_changed(self, candidates, workers, out):
+        """
+        Producer: read and hash candidate notes on I/O threads and put the ones whose
+        content changed on `out` as (file_id, text, content_hash, mtime). Notes that
+        only got a new mtime are put as (file_id, None, content_hash, mtime).
+        The queue is bounded, so reading never runs far ahead of embedding.
+        """
+        def emit(candidate, future):
+            file_id, file_path, mtime, stored_hash = candidate
+            data = future.result()
+            if data is None:
+                return
+            content_hash = hashlib.sha256(data).hexdigest()
+            text = None if content_hash == stored_hash else data.decode('utf-8', errors='replace')
+            out.put((file_id, text, content_hash, mtime))
+
+        workers = workers or default_workers()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # Submit a few reads per thread ahead, not the whole vault at once.
+                window = deque()
+                for candidate in candidates:
+                    window.append((candidate, executor.submit(read_bytes, candidate[1])))
+                    if len(window) >= workers * 4:
+                        emit(*window.popleft())
+                while window:
+                    emit(*window.popleft())
+        except Exception as e:
+            out.put(e)
+        finally:
+            out.put(None)
+
+    def _batches(self, items, batch_size):
+        """
+        Consumer side: group changed notes into batches of similar length, sorted
+        within a window of SORT_WINDOW batches, so encode() pads each batch to a
+        similar length instead of to the longest note in the vault.
+        """
+        window = []
+        for item in items:
+            window.append(item)
+            if len(window) >= batch_size * SORT_WINDOW:
+                yield from self._sorted_batches(window, batch_size)
+                window = []
+        yield from self._sorted_batches(window, batch_size)
+
+    @staticmethod
+    def _sorted_batches(window, batch_size):
+        window.sort(key=lambda item: len(item[1]))
+        for start in range(0, len(window), batch_size):
+            yield window[start:start + batch_size]
+
+    def sync(self, batch_size=BATCH_SIZE, workers=None):
+        """
+        Bring the store up to date with the files table. Changed notes are read on
+        `workers` I/O threads and embedded `batch_size` at a time as they arrive.
+        Returns (embedded, removed): vectors (re)computed and vectors dropped.
+        """
+        if self.readonly:
+            raise RuntimeError("EmbeddingStore opened readonly, cannot sync")
+        start_time = time.perf_counter()
+
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT DISTINCT model FROM embeddings")
+        models = {row[0] for row in cursor.fetchall()}
+        if models - {self.model_name}:
+            logging.info(f"Embedding model changed to {self.model_name}, rebuilding the store.")
+            self._reset()
+
+        cursor.execute("PRAGMA table_info(files)")
+        mtime_column = "f.mtime" if "mtime" in [row[1] for row in cursor.fetchall()] else "NULL"
+        cursor.execute(f"""
+            SELECT f.id, f.path, {mtime_column}, e.content_hash, e.mtime
+            FROM files f
+            LEFT JOIN embeddings e ON e.file_id = f.id
+            WHERE f.deleted = 0
+        """)
+        rows = cursor.fetchall()
+
+        cursor.execute("""
+            SELECT file_id FROM embeddings
+            WHERE file_id NOT IN (SELECT id FROM files WHERE deleted = 0)
+        """)
+        removed_ids = [row[0] for row in cursor.fetchall()]
+
+        candidates = []     # (file_id, path, mtime, stored_hash) with a new mtime
+        for file_id, file_path, mtime, stored_hash, stored_mtime in rows:
+            if mtime is None:
+                try:
+                    mtime = os.stat(file_path).st_mtime
+                except OSError:
+                    continue
+            if stored_hash is None or stored_mtime != mtime:
+                candidates.append((file_id, file_path, mtime, stored_hash))
+
+        if removed_ids and self.index is not None:
+            self.index.remove_ids(np.array(removed_ids, dtype='int64'))
+
+        changed = []        # (file_id, content_hash, mtime) of re-embedded notes
+        touched = []        # (mtime, file_id): same content, newer mtime
+        read_queue = queue.Queue(maxsize=batch_size * SORT_WINDOW * 2)
+        reader = threading.Thread(target=self._read_changed, args=(candidates, workers, read_queue), daemon=True)
+        reader.start()
+
+        def drain():
+            while True:
+                item = read_queue.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                file_id, text, content_hash, mtime = item
+                if text is None:
+                    touched.append((mtime, file_id))
+                else:
+                    yield item
+
+        for batch in self._batches(drain(), batch_size):
+            vectors = self.embed([text for _, text, _, _ in batch], batch_size)
+            ids = np.array([file_id for file_id, _, _, _ in batch], dtype='int64')
+            self._ensure_index(vectors.shape[1])
+            self.index.remove_ids(ids)
+            self.index.add_with_ids(vectors, ids)
+            changed.extend((file_id, content_hash, mtime) for file_id, _, content_hash, mtime in batch)
+        reader.join()
+
+        # The index file is written before the table: if we stop in between,
+        # the next run just embeds those notes again.
+        if (changed or removed_ids) and self.index is not None:
+            self.save()
+            self.ann = None  # rebuilt from the new vectors on the next search
+
+        now = time.time()
+        with self.conn:
+            self.conn.executemany("DELETE FROM embeddings WHERE file_id = ?", [(i,) for i in removed_ids])
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO embeddings (file_id, content_hash, mtime, model, updated)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(file_id, content_hash, mtime, self.model_name, now)
+                  for file_id, content_hash, mtime in changed])
+            self.conn.executemany("UPDATE embeddings SET mtime = ? WHERE file_id = ?", touched)
+
+        elapsed = time.perf_counter() - start_time
+        if changed:
+            print(f"Embedded {len(changed)} notes in {elapsed:.1f}s "
+                  f"({len(changed) / elapsed:.1f} notes/sec, batch size {batch_size}).")
+        logging.info(f"Embeddings synced: {len(changed)} embedded, {len(removed_ids)} removed.")
+        return len(changed), len(removed_ids)
+
+    def get_vector(self, file_id):
+        """The stored vector for a note as a (1, d) array, or None if it has none."""
+        if self.index is None:
+            return None
+        try:
+            return self.index.reconstruct(int(file_id)).reshape(1, -1)
+        except RuntimeError:
+            return None
+
+    def search(self, vector, top_k=10, exclude_ids=()):
+        """Return [(file_id, distance)] nearest to vector, closest first."""
+        index = self.search_index()
+        if index is None or index.ntotal == 0:
+            return []
+        distances, ids = index.search(vector, top_k + len(exclude_ids))
+        results = [(int(i), float(d)) for i, d in zip(ids[0], distances[0])
+                   if i != -1 and i not in exclude_ids]
+        return results[:top_k]
+
+    def search_text(self, text, top_k=10):
+        return self.search(self.embed([text]), top_k)
+
+    def similar_notes(self, file_id, top_k=10):
+        """Return [(file_id, path, distance)] for the notes closest to a stored note."""
+        vector = self.get_vector(file_id)
+        if vector is None:
+            return []
+        hits = self.search(vector, top_k, exclude_ids={file_id})
+        paths = self.get_paths([i for i, _ in hits])
+        return [(i, paths.get(i), distance) for i, distance in hits]
+
+    def get_paths(self, file_ids):
+        if not file_ids:
+            return {}
+        placeholders = ",".join("?" * len(file_ids))
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT id, path FROM files WHERE id IN ({placeholders})", list(file_ids))
+        return dict(cursor.fetchall())
+
+
+def benchmark(store, index_types=INDEX_TYPES, k=10, queries=200):
+    """
+    Print build time, single-query latency and recall@k for each index type, with
+    the exact flat search as ground truth. Queries are stored notes, as in
+    similar-note lookups.
+    """
+    if store.index is None or store.index.ntotal == 0:
+        print("The store is empty, run with --sync first.")
+        return
+
+    vectors = store.index.index.reconstruct_n(0, store.index.ntotal)
+    ids = faiss.vector_to_array(store.index.id_map).astype('int64')
+    rng = np.random.default_rng(0)
+    sample = rng.choice(len(ids), size=min(queries, len(ids)), replace=False)
+    query_vectors = vectors[sample]
+    _, truth = store.index.search(query_vectors, k)
+
+    print(f"{len(ids)} vectors, {len(sample)} queries, k={k}")
+    print(f"{'index':>8} {'build s':>8} {'ms/query':>9} {f'recall@{k}':>10}")
+    for index_type in index_types:
+        start = time.perf_counter()
+        index = store.index if index_type == "flat" else build_ann_index(vectors, ids, index_type)
+        build_seconds = time.perf_counter() - start
+
+        found = []
+        start = time.perf_counter()
+        for i in range(len(sample)):
+            found.append(index.search(query_vectors[i:i + 1], k)[1][0])
+        ms_per_query = (time.perf_counter() - start) * 1000 / len(sample)
+
+        recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+        print(f"{index_type:>8} {build_seconds:8.2f} {ms_per_query:9.3f} {recall:10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update or query the persistent note embedding store.")
+    parser.add_argument("query", nargs="?", help="Free text to find similar notes for")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--db", default="obsidian_index.db")
+    parser.add_argument("--index", default=EMBEDDING_INDEX_PATH)
+    parser.add_argument("--sync", action="store_true", help="Embed new and changed notes first")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Notes per encode() call")
+    parser.add_argument("--workers", type=int, default=None, help="Threads reading notes (default: one per core)")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default=DEFAULT_INDEX_TYPE,
+                        help="Search backend: exact flat, or approximate hnsw / ivfpq")
+    parser.add_argument("--benchmark", action="store_true", help="Compare recall@k and latency of every backend")
+    parser.add_argument("--k", type=int, default=10, help="k for the benchmark's recall@k")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    store = EmbeddingStore(conn, args.index, readonly=not args.sync, index_type=args.index_type)
+
+    if args.sync:
+        start = time.perf_counter()
+        embedded, removed = store.sync(args.batch_size, args.workers)
+        print(f"Embedded {embedded} notes, removed {removed}, "
+              f"{len(store)} in the store ({time.perf_counter() - start:.1f}s).")
+
+    if args.benchmark:
+        benchmark(store, k=args.k)
+
+    if args.query:
+        hits = store.search_text(args.query, args.limit)
+        paths = store.get_paths([file_id for file_id, _ in hits])
+        for file_id, distance in hits:
+            print(f"{distance:8.3f}  {paths.get(file_id)}")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
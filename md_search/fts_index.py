@@ -0,0 +1,230 @@
+import os
+import re
+import time
+import sqlite3
+import logging
+import argparse
+
+from md_fileagent.yaml_constructor import extract_tags_from_content
+
+# Column order matters for bm25() weights and snippet() below.
+FTS_COLUMNS = ("title", "tags", "headings", "content")
+BM25_WEIGHTS = (10.0, 5.0, 3.0, 1.0)
+# How SQLite reports a MATCH string that isn't valid FTS5 query syntax.
+FTS_SYNTAX_ERRORS = ("fts5:", "unterminated string", "unknown special query", "no such column")
+
+frontmatter_pattern = re.compile(r'^---\s*\n(.*?)\n---[ \t]*\n?', re.DOTALL)
+heading_pattern = re.compile(r'^#{1,6}\s+(.+?)\s*#*\s*$', re.MULTILINE)
+
+
+def initialize_fts(conn):
+    """Create the FTS5 table and the triggers that keep it in line with the files table."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS files_fts USING fts5(
+            title,
+            tags,
+            headings,
+            content,
+            tokenize = 'porter unicode61'
+        );
+    """)
+
+    cursor.execute("PRAGMA table_info(files)")
+    existing_columns = [row[1] for row in cursor.fetchall()]
+    if "fts_mtime" not in existing_columns:
+        cursor.execute("ALTER TABLE files ADD COLUMN fts_mtime REAL")
+
+    # files.id is the FTS rowid, so removing or renaming a file only needs the id.
+    cursor.executescript("""
+        CREATE TRIGGER IF NOT EXISTS files_fts_delete AFTER DELETE ON files BEGIN
+            DELETE FROM files_fts WHERE rowid = old.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS files_fts_mark_deleted AFTER UPDATE OF deleted ON files
+        WHEN new.deleted = 1 BEGIN
+            DELETE FROM files_fts WHERE rowid = old.id;
+            UPDATE files SET fts_mtime = NULL WHERE id = old.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS files_fts_rename AFTER UPDATE OF path ON files
+        WHEN new.path <> old.path BEGIN
+            UPDATE files SET fts_mtime = NULL WHERE id = old.id;
+        END;
+    """)
+    conn.commit()
+
+
+def parse_note(content, file_name):
+    """Split a note into the (title, tags, headings, body) columns of the FTS table."""
+    title = os.path.splitext(file_name)[0]
+    tags = " ".join(sorted(extract_tags_from_content(content)))
+
+    body = content
+    frontmatter_match = frontmatter_pattern.match(content)
+    if frontmatter_match:
+        body = content[frontmatter_match.end():]
+
+    headings = "\n".join(heading_pattern.findall(body))
+    return title, tags, headings, body
+
+
+def index_file(conn, file_id, file_path, mtime=None):
+    """(Re)index a single file under its files.id. Returns False if it can't be read."""
+    try:
+        with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
+            content = f.read()
+        if mtime is None:
+            mtime = os.stat(file_path).st_mtime
+    except OSError as e:
+        logging.error(f"Could not index {file_path}: {e}")
+        return False
+
+    title, tags, headings, body = parse_note(content, os.path.basename(file_path))
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM files_fts WHERE rowid = ?", (file_id,))
+    cursor.execute(
+        "INSERT INTO files_fts (rowid, title, tags, headings, content) VALUES (?, ?, ?, ?, ?)",
+        (file_id, title, tags, headings, body)
+    )
+    cursor.execute("UPDATE files SET fts_mtime = ? WHERE id = ?", (mtime, file_id))
+    return True
+
+
+def sync_fts(conn):
+    """
+    Bring files_fts up to date with the files table in a single transaction.
+    Only files whose mtime differs from the one recorded at indexing time are re-read.
+    When the incremental scanner has filled files.mtime that value is trusted, otherwise
+    each file is stat'ed. Returns the number of files (re)indexed.
+    """
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(files)")
+    mtime_column = "mtime" if "mtime" in [row[1] for row in cursor.fetchall()] else "NULL"
+    cursor.execute(f"SELECT id, path, {mtime_column}, fts_mtime FROM files WHERE deleted = 0")
+    rows = cursor.fetchall()
+
+    indexed = 0
+    with conn:
+        for file_id, file_path, mtime, fts_mtime in rows:
+            if mtime is None:
+                try:
+                    mtime = os.stat(file_path).st_mtime
+                except OSError:
+                    continue
+            if fts_mtime == mtime:
+                continue
+            if index_file(conn, file_id, file_path, mtime):
+                indexed += 1
+
+        # Drop anything left behind by rows removed outside the triggers.
+        cursor.execute("""
+            DELETE FROM files_fts
+            WHERE rowid NOT IN (SELECT id FROM files WHERE deleted = 0)
+        """)
+
+    logging.info(f"Full-text index synced, {indexed} files (re)indexed.")
+    return indexed
+
+
+def is_query_syntax_error(error):
+    """True when an OperationalError comes from the FTS5 query, not from the SQL around it."""
+    return str(error).startswith(FTS_SYNTAX_ERRORS)
+
+
+def quote_query(query):
+    """Turn free text into an FTS5 query that matches every word literally."""
+    terms = [term.replace('"', '""') for term in query.split()]
+    return " ".join(f'"{term}"' for term in terms if term)
+
+
+def search_fts(conn, query, limit=10, where="", params=(), snippets=True):
+    """
+    Run a ranked full-text query against an open connection.
+    `where` is an extra SQL condition on the files row `f`, with its `params`.
+    snippets=False skips building snippets (they are None), which is most of the
+    cost when many candidates are fetched.
+    """
+    snippet_sql = "snippet(files_fts, 3, '[', ']', '...', 12)" if snippets else "NULL"
+    sql = f"""
+        SELECT f.id, f.path, f.name,
+               {snippet_sql} AS snippet,
+               bm25(files_fts, {", ".join(str(w) for w in BM25_WEIGHTS)}) AS score
+        FROM files_fts
+        JOIN files f ON f.id = files_fts.rowid
+        WHERE files_fts MATCH ? AND f.deleted = 0 {f"AND {where}" if where else ""}
+        ORDER BY score
+        LIMIT ?
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, (query, *params, limit))
+    except sqlite3.OperationalError as e:
+        # Not valid FTS5 syntax (e.g. a stray quote or colon), search the words instead.
+        # Anything else, like a missing tags table, is a real error.
+        if not is_query_syntax_error(e):
+            raise
+        cursor.execute(sql, (quote_query(query), *params, limit))
+
+    return [
+        {'id': file_id, 'path': path, 'name': name, 'snippet': snippet, 'score': score}
+        for file_id, path, name, snippet, score in cursor.fetchall()
+    ]
+
+
+def get_snippets(conn, query, file_ids):
+    """Snippets for query in the given files, as {file_id: snippet}."""
+    if not file_ids:
+        return {}
+    sql = f"""
+        SELECT rowid, snippet(files_fts, 3, '[', ']', '...', 12)
+        FROM files_fts
+        WHERE files_fts MATCH ? AND rowid IN ({",".join("?" * len(file_ids))})
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, (query, *file_ids))
+    except sqlite3.OperationalError as e:
+        if not is_query_syntax_error(e):
+            raise
+        cursor.execute(sql, (quote_query(query), *file_ids))
+    return dict(cursor.fetchall())
+
+
+def search(query, limit=10, db_path="obsidian_index.db"):
+    """Return up to `limit` ranked hits for `query`, best first."""
+    conn = sqlite3.connect(db_path)
+    try:
+        return search_fts(conn, query, limit)
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-text search over the indexed vault.")
+    parser.add_argument("query", nargs="?", help="FTS5 query, e.g. 'ollama AND tags:ai'")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--db", default="obsidian_index.db")
+    parser.add_argument("--sync", action="store_true", help="Update the index from the files table first")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    initialize_fts(conn)
+
+    if args.sync:
+        indexed = sync_fts(conn)
+        print(f"Indexed {indexed} files.")
+
+    if args.query:
+        start = time.perf_counter()
+        hits = search_fts(conn, args.query, args.limit)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        for hit in hits:
+            print(f"{hit['score']:8.2f}  {hit['path']}")
+            print(f"          {' '.join(hit['snippet'].split())}")
+        print(f"{len(hits)} hits in {elapsed_ms:.1f} ms")
+
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
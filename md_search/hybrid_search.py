@@ -0,0 +1,235 @@
+import os
+import time
+import sqlite3
+import logging
+import argparse
+
+from md_search.fts_index import initialize_fts, search_fts, get_snippets
+from md_search.embedding_store import EmbeddingStore, EMBEDDING_INDEX_PATH
+
+# Reciprocal rank fusion constant: 60 is the usual choice, it keeps one list's
+# top hit from drowning out documents both lists rank reasonably well.
+RRF_K = 60
+# Each retriever returns this many candidates per requested result before fusion.
+CANDIDATES_PER_RESULT = 10
+MIN_CANDIDATES = 100
+PARA_FOLDERS = ("1. Projects", "2. Areas", "3. Resources", "4. Archives")
+
+
+def resolve_folder(folder):
+    """
+    The PARA folder a --folder value names: the full name, the name without its
+    number, or the number, ignoring case; otherwise a part of exactly one name.
+    Raises ValueError when it names no folder or more than one.
+    """
+    value = folder.strip().lower()
+    for name in PARA_FOLDERS:
+        number, _, title = name.lower().partition(". ")
+        if value in (name.lower(), title, number):
+            return name
+    matches = [name for name in PARA_FOLDERS if value and value in name.lower()]
+    if len(matches) == 1:
+        return matches[0]
+    if matches:
+        raise ValueError(f"Folder {folder!r} is ambiguous, it matches {matches}")
+    raise ValueError(f"Unknown folder {folder!r}, expected one of {list(PARA_FOLDERS)}")
+
+
+def filter_clause(tags=None, created_after=None, created_before=None, folder=None):
+    """
+    SQL condition on the files row `f` for the optional filters, and its parameters.
+      tags: every tag must be in the note's frontmatter (a leading '#' is ignored)
+      created_after / created_before: 'YYYY-MM-DD' bounds on files.date_created,
+        the date written to the notes' date-created field (before is exclusive)
+      folder: top-level PARA folder, e.g. "1. Projects", "projects" or "1"; a
+        partial name is accepted when it fits only one folder
+    """
+    clauses = []
+    params = []
+
+    for tag in tags or ():
+        clauses.append("""f.id IN (
+            SELECT ft.file_id FROM file_tags ft JOIN tags t ON t.id = ft.tag_id WHERE t.tag = ?
+        )""")
+        params.append(tag.lstrip("#"))
+
+    if created_after:
+        clauses.append("f.date_created >= ?")
+        params.append(created_after)
+    if created_before:
+        clauses.append("f.date_created < ?")
+        params.append(created_before)
+
+    if folder:
+        clauses.append("f.path LIKE ?")
+        params.append(f"%{os.sep}{resolve_folder(folder)}{os.sep}%")
+
+    return " AND ".join(clauses), params
+
+
+def rrf_fuse(*rankings, k=RRF_K):
+    """Combine ranked id lists into {id: score} with reciprocal rank fusion."""
+    scores = {}
+    for ranking in rankings:
+        for rank, file_id in enumerate(ranking, start=1):
+            scores[file_id] = scores.get(file_id, 0.0) + 1.0 / (k + rank)
+    return scores
+
+
+class HybridSearcher:
+    """
+    Answers queries from the precomputed indexes only: the FTS5 table for BM25
+    keyword ranking and the note embedding store (memory-mapped, read-only) for
+    semantic ranking, fused with reciprocal rank fusion. Keep one instance around
+    for many queries: the embedding model and the index are loaded once.
+    """
+
+    def __init__(self, db_path="obsidian_index.db", index_path=EMBEDDING_INDEX_PATH,
+                 index_type="hnsw", semantic=True, check_same_thread=True):
+        self.conn = sqlite3.connect(db_path, check_same_thread=check_same_thread)
+        initialize_fts(self.conn)
+        self.index_path = index_path
+        self.index_type = index_type
+        self.semantic = semantic
+        self.store = None
+        self.index_mtime = None
+        self.refresh()
+
+    def refresh(self):
+        """(Re)open the embedding store if its index file appeared or changed on disk."""
+        if not self.semantic:
+            return False
+        mtime = os.path.getmtime(self.index_path) if os.path.exists(self.index_path) else None
+        if mtime == self.index_mtime:
+            return False
+        self.index_mtime = mtime
+        self.store = EmbeddingStore(self.conn, self.index_path, readonly=True, index_type=self.index_type)
+        if len(self.store) == 0:
+            logging.info("No note embeddings yet, keyword search only.")
+            self.store = None
+        return True
+
+    def warm_up(self):
+        """Load the embedding model and the search index before the first query."""
+        if self.store is not None:
+            self.store.search_text("warm up", 1)
+
+    def keyword_ranking(self, query, pool, where, params):
+        return search_fts(self.conn, query, pool, where, params, snippets=False)
+
+    def passing_filters(self, file_ids, where, params):
+        """The subset of file_ids whose rows are live and pass the filters."""
+        allowed = set()
+        cursor = self.conn.cursor()
+        # Stay under SQLite's bound-parameter limit.
+        for i in range(0, len(file_ids), 500):
+            batch = file_ids[i:i + 500]
+            cursor.execute(f"""
+                SELECT f.id FROM files f
+                WHERE f.id IN ({",".join("?" * len(batch))}) AND f.deleted = 0 {f"AND {where}" if where else ""}
+            """, batch + list(params))
+            allowed.update(row[0] for row in cursor.fetchall())
+        return allowed
+
+    def semantic_ranking(self, query, pool, where, params):
+        """
+        Nearest notes to the query embedding that pass the filters, as [(id, cosine)].
+        The filters are applied to the neighbours, so when too few of the nearest
+        `pool` pass, the search is widened until `pool` do or every note was looked at.
+        """
+        vector = self.store.embed([query])
+        top_k = pool
+        while True:
+            hits = self.store.search(vector, top_k)
+            allowed = self.passing_filters([file_id for file_id, _ in hits], where, params)
+            if len(allowed) >= pool or len(hits) < top_k or top_k >= len(self.store):
+                break
+            top_k *= 4
+        # Squared L2 between unit vectors is 2 - 2 * cosine.
+        return [(file_id, 1.0 - distance / 2) for file_id, distance in hits if file_id in allowed][:pool]
+
+    def search(self, query, limit=10, tags=None, created_after=None, created_before=None, folder=None):
+        """
+        Return up to `limit` hits, best first, as dicts with id, path, name, score,
+        snippet (keyword hits only), keyword_rank, semantic_rank and similarity.
+        """
+        where, params = filter_clause(tags, created_after, created_before, folder)
+        pool = max(MIN_CANDIDATES, limit * CANDIDATES_PER_RESULT)
+
+        keyword_hits = self.keyword_ranking(query, pool, where, params)
+        semantic_hits = self.semantic_ranking(query, pool, where, params) if self.store else []
+
+        keyword_ids = [hit['id'] for hit in keyword_hits]
+        semantic_ids = [file_id for file_id, _ in semantic_hits]
+        scores = rrf_fuse(keyword_ids, semantic_ids)
+        best = sorted(scores, key=scores.get, reverse=True)[:limit]
+
+        by_id = {hit['id']: hit for hit in keyword_hits}
+        # Snippets only for the keyword hits that made the cut.
+        snippets = get_snippets(self.conn, query, [file_id for file_id in best if file_id in by_id])
+        keyword_rank = {file_id: rank for rank, file_id in enumerate(keyword_ids, start=1)}
+        semantic_rank = {file_id: rank for rank, file_id in enumerate(semantic_ids, start=1)}
+        similarity = dict(semantic_hits)
+
+        missing = [file_id for file_id in best if file_id not in by_id]
+        if missing:
+            cursor = self.conn.cursor()
+            cursor.execute(f"SELECT id, path, name FROM files WHERE id IN ({','.join('?' * len(missing))})", missing)
+            for file_id, path, name in cursor.fetchall():
+                by_id[file_id] = {'id': file_id, 'path': path, 'name': name}
+
+        return [
+            {
+                'id': file_id,
+                'path': by_id[file_id]['path'],
+                'name': by_id[file_id]['name'],
+                'snippet': snippets.get(file_id),
+                'score': scores[file_id],
+                'keyword_rank': keyword_rank.get(file_id),
+                'semantic_rank': semantic_rank.get(file_id),
+                'similarity': similarity.get(file_id),
+            }
+            for file_id in best if file_id in by_id
+        ]
+
+    def close(self):
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hybrid keyword + semantic search over the vault.")
+    parser.add_argument("query")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--tag", action="append", dest="tags", help="Only notes with this tag (repeatable)")
+    parser.add_argument("--after", help="Only notes created on or after YYYY-MM-DD")
+    parser.add_argument("--before", help="Only notes created before YYYY-MM-DD")
+    parser.add_argument("--folder", help="Only notes in this PARA folder, e.g. projects")
+    parser.add_argument("--db", default="obsidian_index.db")
+    parser.add_argument("--index", default=EMBEDDING_INDEX_PATH)
+    parser.add_argument("--index-type", default="hnsw", choices=("flat", "hnsw", "ivfpq"))
+    parser.add_argument("--keyword-only", action="store_true", help="Skip the embedding model")
+    args = parser.parse_args()
+    if args.folder:
+        try:
+            resolve_folder(args.folder)
+        except ValueError as e:
+            parser.error(str(e))
+
+    searcher = HybridSearcher(args.db, args.index, args.index_type, semantic=not args.keyword_only)
+    searcher.warm_up()
+
+    start = time.perf_counter()
+    hits = searcher.search(args.query, args.limit, args.tags, args.after, args.before, args.folder)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+
+    for hit in hits:
+        ranks = f"kw {hit['keyword_rank'] or '-':>3} sem {hit['semantic_rank'] or '-':>3}"
+        print(f"{hit['score']:.4f}  {ranks}  {hit['path']}")
+        if hit['snippet']:
+            print(f"          {' '.join(hit['snippet'].split())}")
+    print(f"{len(hits)} hits in {elapsed_ms:.1f} ms")
+    searcher.close()
+
+
+if __name__ == '__main__':
+    main()
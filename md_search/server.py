@@ -0,0 +1,187 @@
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from md_search.hybrid_search import HybridSearcher
+from md_search.embedding_store import EMBEDDING_INDEX_PATH
+from md_fileagent.tag_sqlite import get_tag_vocabulary
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+
+class VaultService:
+    """
+    The warm state behind the server: one HybridSearcher (SQLite connection, FTS,
+    memory-mapped embedding index and the loaded embedding model) and the tag
+    vocabulary. Requests are served one at a time under a lock since they share
+    the connection; each takes milliseconds. Index files rewritten by a sync in
+    another process are picked up on the next request.
+    """
+
+    def __init__(self, db_path="obsidian_index.db", index_path=EMBEDDING_INDEX_PATH, index_type="hnsw"):
+        self.db_path = db_path
+        self.searcher = HybridSearcher(db_path, index_path, index_type, check_same_thread=False)
+        self.searcher.warm_up()
+        self.lock = threading.Lock()
+        self.vocabulary = []
+        self.vocabulary_mtime = None
+
+    def refresh(self):
+        if self.searcher.refresh():
+            self.searcher.warm_up()
+        mtime = os.path.getmtime(self.db_path)
+        if mtime != self.vocabulary_mtime:
+            self.vocabulary_mtime = mtime
+            try:
+                self.vocabulary = get_tag_vocabulary(self.searcher.conn)
+            except Exception:
+                self.vocabulary = []  # tag index not built yet
+
+    def file_id(self, path):
+        cursor = self.searcher.conn.cursor()
+        cursor.execute("SELECT id FROM files WHERE path = ? AND deleted = 0", (path,))
+        row = cursor.fetchone()
+        if row is None:
+            raise KeyError(f"Not in the index: {path}")
+        return row[0]
+
+    def search(self, query, limit=10, tags=None, after=None, before=None, folder=None):
+        return self.searcher.search(query, limit, tags, after, before, folder)
+
+    def similar(self, path, limit=10):
+        store = self.searcher.store
+        if store is None:
+            return []
+        return [
+            {'id': file_id, 'path': note_path, 'similarity': 1.0 - distance / 2}
+            for file_id, note_path, distance in store.similar_notes(self.file_id(path), limit)
+        ]
+
+    def suggest_tags(self, path, limit=5, neighbours=20):
+        """
+        Tags of the most similar notes, weighted by similarity, leaving out the
+        note's own tags. No model call, so it answers in milliseconds.
+        """
+        file_id = self.file_id(path)
+        similar = self.similar(path, neighbours)
+        if not similar:
+            return []
+        weights = {hit['id']: hit['similarity'] for hit in similar}
+
+        cursor = self.searcher.conn.cursor()
+        cursor.execute("""
+            SELECT t.tag FROM file_tags ft JOIN tags t ON t.id = ft.tag_id WHERE ft.file_id = ?
+        """, (file_id,))
+        own_tags = {row[0] for row in cursor.fetchall()}
+
+        placeholders = ",".join("?" * len(weights))
+        cursor.execute(f"""
+            SELECT ft.file_id, t.tag FROM file_tags ft JOIN tags t ON t.id = ft.tag_id
+            WHERE ft.file_id IN ({placeholders})
+        """, list(weights))
+        scores = {}
+        for neighbour_id, tag in cursor.fetchall():
+            if tag not in own_tags:
+                scores[tag] = scores.get(tag, 0.0) + weights[neighbour_id]
+
+        best = sorted(scores, key=scores.get, reverse=True)[:limit]
+        return [{'tag': tag, 'score': round(scores[tag], 4)} for tag in best]
+
+
+def make_handler(service):
+    class VaultRequestHandler(BaseHTTPRequestHandler):
+        """
+        GET /search?q=...&limit=&tag=&after=&before=&folder=
+        GET /similar?path=...&limit=
+        GET /suggest-tags?path=...&limit=
+        GET /tags
+        GET /health
+        """
+
+        def send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = parse_qs(url.query)
+
+            def param(name, default=None):
+                return params.get(name, [default])[0]
+
+            start = time.perf_counter()
+            try:
+                limit = int(param("limit", 10))
+                with service.lock:
+                    service.refresh()
+                    if url.path == "/search":
+                        if not param("q"):
+                            return self.send_json(400, {'error': "missing q"})
+                        result = service.search(param("q"), limit, params.get("tag"),
+                                                param("after"), param("before"), param("folder"))
+                    elif url.path == "/similar":
+                        result = service.similar(param("path"), limit)
+                    elif url.path == "/suggest-tags":
+                        result = service.suggest_tags(param("path"), int(param("limit", 5)))
+                    elif url.path == "/tags":
+                        result = service.vocabulary
+                    elif url.path == "/health":
+                        result = {'status': "ok"}
+                    else:
+                        return self.send_json(404, {'error': f"unknown endpoint {url.path}"})
+            except KeyError as e:
+                return self.send_json(404, {'error': str(e.args[0])})
+            except ValueError as e:
+                return self.send_json(400, {'error': str(e)})
+            except Exception as e:
+                logging.exception(f"Failed to handle {self.path}")
+                return self.send_json(500, {'error': str(e)})
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.send_json(200, {'results': result, 'elapsed_ms': round(elapsed_ms, 2)})
+
+        def log_message(self, format, *args):
+            logging.info(f"{self.address_string()} {format % args}")
+
+    return VaultRequestHandler
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, db_path="obsidian_index.db",
+          index_path=EMBEDDING_INDEX_PATH, index_type="hnsw"):
+    """Load everything once, then answer requests until interrupted with Ctrl+C."""
+    start = time.perf_counter()
+    service = VaultService(db_path, index_path, index_type)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Vault index warm in {time.perf_counter() - start:.1f}s, serving on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.searcher.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve search, similar-notes and tag suggestions over HTTP.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--db", default="obsidian_index.db")
+    parser.add_argument("--index", default=EMBEDDING_INDEX_PATH)
+    parser.add_argument("--index-type", default="hnsw", choices=("flat", "hnsw", "ivfpq"))
+    args = parser.parse_args()
+    serve(args.host, args.port, args.db, args.index, args.index_type)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+import os
+import sqlite3
+import logging
+import argparse
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+enex_search_dir = "/Users/bogle/Dev/Agent/markDownSearch/drive-download/"
+
+
+def initialize_enex_table(conn):
+    """Create the Evernote lookup tables if they don't exist."""
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS enex_notes (
+            notebook TEXT NOT NULL,
+            title TEXT NOT NULL,
+            created DATETIME,
+            updated DATETIME
+        );
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_enex_notes_title
+        ON enex_notes(notebook, title)
+    """)
+    # Remembers which exports were imported so unchanged ones are skipped.
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS enex_files (
+            path TEXT PRIMARY KEY,
+            mtime REAL,
+            size INTEGER
+        );
+    """)
+    conn.commit()
+
+
+def parse_enex_date(value):
+    """Convert an Evernote timestamp like "20230609T185031Z" to an ISO string."""
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value.strip(), "%Y%m%dT%H%M%SZ").isoformat()
+    except ValueError:
+        return None
+
+
+def iter_enex_notes(enex_filepath):
+    """
+    Stream (title, created, updated) for every <note> in an .enex file.
+    Each note is cleared from the tree once read, so memory stays bounded
+    no matter how large the export is.
+    """
+    root = None
+    for event, elem in ET.iterparse(enex_filepath, events=("start", "end")):
+        if root is None and event == "start":
+            root = elem
+            continue
+        if event != "end" or elem.tag != "note":
+            continue
+
+        title = (elem.findtext("title") or "").strip()
+        created = parse_enex_date(elem.findtext("created"))
+        updated = parse_enex_date(elem.findtext("updated"))
+        if title:
+            yield title, created, updated
+
+        elem.clear()
+        root.clear()
+
+
+def import_enex_file(conn, enex_filepath):
+    """Replace the rows of one notebook with the notes in its .enex file. Returns the note count."""
+    notebook = os.path.splitext(os.path.basename(enex_filepath))[0]
+    st = os.stat(enex_filepath)
+    cursor = conn.cursor()
+    count = 0
+    with conn:
+        cursor.execute("DELETE FROM enex_notes WHERE notebook = ?", (notebook,))
+        for title, created, updated in iter_enex_notes(enex_filepath):
+            # First note wins on duplicate titles, as the old linear search did.
+            cursor.execute("""
+                INSERT OR IGNORE INTO enex_notes (notebook, title, created, updated)
+                VALUES (?, ?, ?, ?)
+            """, (notebook, title, created, updated))
+            count += 1
+        cursor.execute("""
+            INSERT OR REPLACE INTO enex_files (path, mtime, size) VALUES (?, ?, ?)
+        """, (enex_filepath, st.st_mtime, st.st_size))
+    logging.info(f"Imported {count} notes from {enex_filepath}")
+    return count
+
+
+def import_enex_dir(conn, enex_dir=enex_search_dir):
+    """Import every .enex export in enex_dir that is new or changed since the last import."""
+    initialize_enex_table(conn)
+    if not os.path.isdir(enex_dir):
+        logging.error(f"Evernote export directory not found: {enex_dir}")
+        return 0
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT path, mtime, size FROM enex_files")
+    imported = {path: (mtime, size) for path, mtime, size in cursor.fetchall()}
+
+    notebooks = 0
+    for entry in os.scandir(enex_dir):
+        if not entry.name.endswith(".enex"):
+            continue
+        st = entry.stat()
+        if imported.get(entry.path) == (st.st_mtime, st.st_size):
+            continue
+        try:
+            import_enex_file(conn, entry.path)
+            notebooks += 1
+        except ET.ParseError as e:
+            logging.error(f"Could not parse {entry.path}: {e}")
+    return notebooks
+
+
+def get_notebook_name(md_filepath):
+    """
+    The notebook a Markdown file was exported from: the folder after 'Evernote'
+    if present, or immediately after '4. Archives' otherwise. None for other notes.
+    """
+    for marker in ("Evernote", "4. Archives"):
+        if marker in md_filepath:
+            remainder = md_filepath.split(marker)[1].lstrip(os.sep)
+            return remainder.split(os.sep)[0]
+    return None
+
+
+def lookup_note_created(conn, md_filepath):
+    """Return the Evernote <created> datetime for a Markdown file, or None if unknown."""
+    notebook = get_notebook_name(md_filepath)
+    if notebook is None:
+        return None
+
+    title = os.path.splitext(os.path.basename(md_filepath))[0]
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT created FROM enex_notes WHERE notebook = ? AND title = ?",
+        (notebook, title)
+    )
+    row = cursor.fetchone()
+    if row and row[0]:
+        return datetime.fromisoformat(row[0])
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import Evernote .enex exports into the lookup table.")
+    parser.add_argument("--db", default="obsidian_index.db")
+    parser.add_argument("--enex-dir", default=enex_search_dir)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    notebooks = import_enex_dir(conn, args.enex_dir)
+    print(f"Imported {notebooks} notebooks.")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,12 @@
 import os
 import sqlite3
+import argparse
 import hashlib
-import xml.etree.ElementTree as ET
 from datetime import datetime
 
+from md_fileagent.vault_reader import read_vault
+from md_sqlite.enex_import import initialize_enex_table, import_enex_dir, lookup_note_created
+
 def initialize_db(db_path="files.db"):
     """Initialize the SQLite database and create the table if it doesn't exist."""
     conn = sqlite3.connect(db_path)
@@ -34,115 +37,79 @@ def compute_file_hash(file_path):
         print(f"Error reading {file_path}: {e}")
         return None
 
-def get_existing_files(conn):
-    """Retrieve a dictionary of existing file records keyed by file_hash."""
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, path, name, file_hash FROM files WHERE deleted = 0")
-    rows = cursor.fetchall()
-    existing = {}
-    for row in rows:
-        file_id, path, name, file_hash = row
-        if file_hash:
-            existing[file_hash] = {'id': file_id, 'path': path, 'name': name}
-    return existing
-
-def get_note_created_date(md_filepath):
+def get_note_created_date(md_filepath, conn):
     """
-    Given the full path of a Markdown file in "4. Archives", this function:
-      - Extracts the folder name after 'Evernote' if present, or immediately after '4. Archives' otherwise.
-      - Constructs the corresponding .enex filename from that folder name.
-      - Searches the .enex file for a note with a <title> matching the Markdown file's base name.
-      - Returns the note's <created> date as an ISO-formatted string.
+    Given the full path of a Markdown file in "4. Archives", look up the note's <created>
+    date in the enex_notes table (see md_sqlite/enex_import.py) and return it as an
+    ISO-formatted string.
     
-    If the .enex file is not found or no matching note is located, it falls back to the file's creation date.
+    If no matching note is located, it falls back to the file's creation date.
     
     Parameters:
         md_filepath (str): Full path of the Markdown file.
           e.g. "/Users/bogle/Dev/obsidian/Bogle/4. Archives/Evernote/Dotnet/Robyn.md"
                "/Users/bogle/Dev/obsidian/Bogle/4. Archives/AI/SomeNote.md"
+        conn: Open connection holding the enex_notes table.
     
     Returns:
         str: The ISO-formatted creation date.
     """
-    folder_name = None
-    if "Evernote" in md_filepath:
-        parts = md_filepath.split("Evernote")
-        remainder = parts[1].lstrip(os.sep)
-        folder_name = remainder.split(os.sep)[0]
-    elif "4. Archives" in md_filepath:
-        parts = md_filepath.split("4. Archives")
-        remainder = parts[1].lstrip(os.sep)
-        folder_name = remainder.split(os.sep)[0]
-    else:
-        # Fallback if neither Evernote nor 4. Archives is in the path.
+    created = lookup_note_created(conn, md_filepath)
+    if created is None:
         return datetime.fromtimestamp(os.path.getctime(md_filepath)).isoformat()
+    return created.isoformat()
 
-    base_name = os.path.splitext(os.path.basename(md_filepath))[0]
-    enex_search_dir = "/Users/bogle/Dev/Agent/markDownSearch/drive-download/"
-    enex_filename = f"{folder_name}.enex"
-    enex_filepath = os.path.join(enex_search_dir, enex_filename)
-
-    try:
-        tree = ET.parse(enex_filepath)
-    except FileNotFoundError:
-        print(f"File NotF ound Error {md_filepath}")
-        return datetime.fromtimestamp(os.path.getctime(md_filepath)).isoformat()
+def add_hash_cache_columns(conn):
+    """Add the mtime/size columns used to reuse a stored hash, if they are missing."""
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA table_info(files)")
+    existing_columns = [row[1] for row in cursor.fetchall()]
 
-    root = tree.getroot()
+    if "mtime" not in existing_columns:
+        cursor.execute("ALTER TABLE files ADD COLUMN mtime REAL")
+    if "size" not in existing_columns:
+        cursor.execute("ALTER TABLE files ADD COLUMN size INTEGER")
 
-    for note in root.findall("note"):
-        title_elem = note.find("title")
-        if title_elem is not None and title_elem.text.strip() == base_name:
-            created_elem = note.find("created")
-            if created_elem is not None:
-                created_str = created_elem.text.strip()  # e.g., "20230609T185031Z"
-                dt = datetime.strptime(created_str, "%Y%m%dT%H%M%SZ")
-                return dt.isoformat()
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_files_hash ON files(file_hash)")
+    conn.commit()
 
-    # Fallback if no matching note is found
-    return datetime.fromtimestamp(os.path.getctime(md_filepath)).isoformat()
+def get_date_created(conn, file_path):
+    """Creation date for a row, taken from the Evernote export for archived notes."""
+    if "4. Archives" in file_path:
+        return get_note_created_date(file_path, conn)
+    return datetime.fromtimestamp(os.path.getctime(file_path)).isoformat()
 
-def add_or_update_file(conn, file_path):
-    """Add a new file or update an existing one if renamed."""
+def scan_directory(conn, directory, workers=None):
+    """
+    Scan the directory for files and sync the files table with it.
+      - The stored hash is reused when a file's mtime and size are unchanged,
+        so every other file is hashed exactly once per scan.
+      - Existing rows are loaded once, keyed by path and by hash.
+      - A new path whose hash belongs to a row that was not seen this scan is a rename.
+      - Rows that were not seen are marked deleted; a file that can't be stat'ed or
+        hashed this time keeps its row as it is.
+    All UPDATE/INSERT statements are written in one transaction.
+    """
+    allowed_dirs = {"1. Projects", "2. Areas", "3. Resources", "4. Archives"}
+    add_hash_cache_columns(conn)
+    initialize_enex_table(conn)
     cursor = conn.cursor()
-    file_hash = compute_file_hash(file_path)
-    if file_hash is None:
-        print(f"Skip files that couldn’t be hashed {file_path}")
-        return  # Skip files that couldn’t be hashed
-    file_name = os.path.basename(file_path)
 
-    # Determine date_created based on file location
-    if "4. Archives" in file_path:
-        note_date = get_note_created_date(file_path)
-        date_created = note_date
-    else:
-        date_created = datetime.fromtimestamp(os.path.getctime(file_path)).isoformat()
-    
-    existing_files = get_existing_files(conn)
-    
-    if file_hash in existing_files:
-        record = existing_files[file_hash]
-        if record['path'] != file_path or record['name'] != file_name:
-            cursor.execute("""
-                UPDATE files 
-                SET path = ?, name = ?, date_created = ?
-                WHERE id = ?
-            """, (file_path, file_name, date_created, record['id']))
-            conn.commit()
-            print(f"Updated file record for: {file_path}")
-    else:
-        cursor.execute("""
-            INSERT INTO files (name, path, date_created, file_hash, deleted)
-            VALUES (?, ?, ?, ?, 0)
-        """, (file_name, file_path, date_created, file_hash))
-        conn.commit()
-        print(f"Added new file: {file_path}")
-
-def scan_directory(conn, directory):
-    """Scan the directory for files and process them."""
-    allowed_dirs = {"1. Projects", "2. Areas", "3. Resources", "4. Archives"}
-    seen_hashes = set()
-    
+    cursor.execute("SELECT id, path, file_hash, mtime, size FROM files WHERE deleted = 0")
+    rows_by_path = {}
+    rows_by_hash = {}
+    duplicate_ids = []
+    for row in cursor.fetchall():
+        file_id, path, file_hash, mtime, size = row
+        if path in rows_by_path:
+            duplicate_ids.append(file_id)
+            continue
+        rows_by_path[path] = row
+        if file_hash:
+            rows_by_hash.setdefault(file_hash, []).append(row)
+
+    seen_ids = set()
+    to_hash = []
     for root, dirs, files in os.walk(directory):
         relative_root = os.path.relpath(root, directory)
         if relative_root != ".":
@@ -154,24 +121,85 @@ def scan_directory(conn, directory):
             if not file.endswith(".md"):
                 continue
             full_path = os.path.join(root, file)
-            file_hash = compute_file_hash(full_path)
-            if file_hash:
-                seen_hashes.add(file_hash)
-                add_or_update_file(conn, full_path)
-    
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, file_hash, path FROM files WHERE deleted = 0")
-    for file_id, file_hash, path in cursor.fetchall():
-        if file_hash not in seen_hashes:
-            cursor.execute("UPDATE files SET deleted = 1 WHERE id = ?", (file_id,))
-            conn.commit()
-            print(f"Marked file as deleted: {path}")
+            row = rows_by_path.get(full_path)
+            try:
+                st = os.stat(full_path)
+            except OSError as e:
+                print(f"Error reading {full_path}: {e}")
+                # The file is still there; a read error must not mark its row deleted.
+                if row:
+                    seen_ids.add(row[0])
+                continue
+
+            if row and row[2] and row[3] == st.st_mtime and row[4] == st.st_size:
+                seen_ids.add(row[0])
+                continue
+            to_hash.append((full_path, st))
+
+    updates = []
+    new_files = []
+    # Hashing is fanned out over a thread pool; results stream back in walk order.
+    hashed = read_vault([full_path for full_path, st in to_hash], workers=workers, use_processes=False)
+    for (full_path, st), note in zip(to_hash, hashed):
+        file_hash = note['hash']
+        row = rows_by_path.get(full_path)
+        if file_hash is None:
+            print(f"Skip files that couldn’t be hashed {full_path}: {note['error']}")
+            if row:
+                seen_ids.add(row[0])
+            continue
+        if row:
+            seen_ids.add(row[0])
+            updates.append((file_hash, st.st_mtime, st.st_size, row[0]))
+        else:
+            new_files.append((full_path, file_hash, st))
+
+    # Renames are matched only once the whole tree has been walked, so a copy of a
+    # file that still exists never steals the original's row.
+    renames = []
+    inserts = []
+    for full_path, file_hash, st in new_files:
+        candidates = [row for row in rows_by_hash.get(file_hash, []) if row[0] not in seen_ids]
+        if candidates:
+            file_id = candidates[0][0]
+            seen_ids.add(file_id)
+            renames.append((full_path, os.path.basename(full_path), get_date_created(conn, full_path),
+                            st.st_mtime, st.st_size, file_id))
+            print(f"Updated file record for: {full_path}")
+        else:
+            inserts.append((os.path.basename(full_path), full_path, get_date_created(conn, full_path),
+                            file_hash, st.st_mtime, st.st_size))
+            print(f"Added new file: {full_path}")
+
+    deleted = [(row[0],) for row in rows_by_path.values() if row[0] not in seen_ids]
+    deleted += [(file_id,) for file_id in duplicate_ids]
+
+    with conn:
+        cursor.executemany("UPDATE files SET file_hash = ?, mtime = ?, size = ? WHERE id = ?", updates)
+        cursor.executemany("""
+            UPDATE files
+            SET path = ?, name = ?, date_created = ?, mtime = ?, size = ?
+            WHERE id = ?
+        """, renames)
+        cursor.executemany("""
+            INSERT INTO files (name, path, date_created, file_hash, deleted, mtime, size)
+            VALUES (?, ?, ?, ?, 0, ?, ?)
+        """, inserts)
+        cursor.executemany("UPDATE files SET deleted = 1 WHERE id = ?", deleted)
+
+    print(f"Scan complete: {len(inserts)} added, {len(updates)} modified, "
+          f"{len(renames)} renamed, {len(deleted)} marked as deleted")
 
 def main():
+    parser = argparse.ArgumentParser(description="Hash and index the vault into files_sql_date.db.")
+    parser.add_argument("--workers", type=int, default=None, help="Hashing threads (default: CPU count)")
+    args = parser.parse_args()
+
     db_path = "files_sql_date.db"
     directory_to_scan = "/Users/bogle/Dev/obsidian/Bogle"
     conn = initialize_db(db_path)
-    scan_directory(conn, directory_to_scan)
+    import_enex_dir(conn)
+    scan_directory(conn, directory_to_scan, args.workers)
     conn.close()
 
 if __name__ == '__main__':
@@ -0,0 +1,190 @@
+import zlib
+from collections import deque
+
+from md_fileagent.context_packer import split_blocks
+from md_fileagent.prompt_budget import count_tokens, fit_prompt, get_encoding, DEFAULT_ENCODING
+
+CHUNK_TEMPLATE = """This is one section of a longer note. Summarize its key points in 2-3 sentences.
+Keep names, decisions, dates and numbers.
+
+Section:
+{content}
+"""
+
+REDUCE_TEMPLATE = """These are summaries of consecutive sections of one note.
+Merge them into a single summary of at most 5 sentences, keeping the most important points.
+
+Section summaries:
+{content}
+"""
+
+CHUNK_SYSTEM_PROMPT = "You are a helpful and concise assistant that summarizes notes faithfully."
+
+# A paragraph whose crc32 is divisible by this is also a place a chunk may end.
+# Boundaries then depend on the text around them, not on everything before,
+# so an edit early in a note doesn't shift every later chunk.
+BREAK_MODULUS = 8
+
+
+def split_chunks(content, max_tokens, encoding_name=DEFAULT_ENCODING):
+    """
+    Split a note into chunks of at most max_tokens, on block boundaries where possible.
+    Once a chunk is half full it ends before the next heading or after a paragraph
+    picked by content hash; otherwise it ends when the next block would not fit.
+    Blocks bigger than max_tokens are cut into token-sized pieces.
+    """
+    encoding = get_encoding(encoding_name)
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current_tokens
+        if current:
+            chunks.append("\n\n".join(current))
+            current.clear()
+            current_tokens = 0
+
+    for kind, text in split_blocks(content):
+        tokens = encoding.encode(text)
+        if len(tokens) > max_tokens:
+            flush()
+            for start in range(0, len(tokens), max_tokens):
+                chunks.append(encoding.decode(tokens[start:start + max_tokens]))
+            continue
+
+        # +2 roughly covers the blank line joining blocks; fit_prompt trims any excess.
+        if current_tokens + len(tokens) + 2 > max_tokens:
+            flush()
+        elif kind == "heading" and current_tokens >= max_tokens // 2:
+            flush()
+
+        current.append(text)
+        current_tokens += len(tokens) + 2
+
+        if (kind != "heading" and current_tokens >= max_tokens // 2
+                and zlib.crc32(text.encode("utf-8")) % BREAK_MODULUS == 0):
+            flush()
+    flush()
+    return chunks
+
+
+class MapReduceSummarizer:
+    """
+    Summarizes notes of any length. A note that fits the context window takes a
+    single call with final_template, as before. Longer notes are split into
+    token-bounded chunks that are summarized concurrently (map), the chunk summaries
+    are merged in token-bounded groups until they fit one prompt (reduce), and the
+    last call uses final_template so the output looks the same either way.
+
+    chat(messages) -> str sends one request; pass a cached one (cached_chat) so
+    unchanged chunks of an edited note are answered from the response cache.
+    submit(func, *args) -> Future runs a request concurrently, e.g.
+    OllamaScheduler.submit_task or ThreadPoolExecutor.submit.
+    final_template takes the text as a positional '{}'.
+    """
+
+    def __init__(self, chat, submit, final_template, system_prompt, max_context_length=2048,
+                 completion_tokens=150, chunk_completion_tokens=200, encoding_name=DEFAULT_ENCODING):
+        self.chat = chat
+        self.submit = submit
+        self.final_template = final_template
+        self.system_prompt = system_prompt
+        self.max_context_length = max_context_length
+        self.completion_tokens = completion_tokens
+        self.chunk_completion_tokens = chunk_completion_tokens
+        self.encoding_name = encoding_name
+
+        system_tokens = count_tokens(CHUNK_SYSTEM_PROMPT, encoding_name)
+        self.chunk_tokens = (max_context_length - chunk_completion_tokens - system_tokens
+                             - count_tokens(CHUNK_TEMPLATE.format(content=""), encoding_name))
+        self.reduce_tokens = (max_context_length - chunk_completion_tokens - system_tokens
+                              - count_tokens(REDUCE_TEMPLATE.format(content=""), encoding_name))
+        self.final_tokens = (max_context_length - completion_tokens
+                             - count_tokens(system_prompt, encoding_name)
+                             - count_tokens(final_template.format(""), encoding_name))
+
+    def _ask(self, system_prompt, prompt):
+        return self.chat([
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt},
+        ]).strip()
+
+    def _final(self, text):
+        prompt = fit_prompt(self.final_template, text, self.max_context_length,
+                            self.completion_tokens + count_tokens(self.system_prompt, self.encoding_name),
+                            content_key=None, encoding_name=self.encoding_name, pack=False)
+        return self._ask(self.system_prompt, prompt)
+
+    def _section(self, template, text):
+        prompt = fit_prompt(template, text, self.max_context_length,
+                            self.chunk_completion_tokens + count_tokens(CHUNK_SYSTEM_PROMPT, self.encoding_name),
+                            encoding_name=self.encoding_name, pack=False)
+        return self._ask(CHUNK_SYSTEM_PROMPT, prompt)
+
+    def _group(self, summaries):
+        """Greedily group consecutive summaries so each group fits one reduce prompt."""
+        groups = [[]]
+        group_tokens = 0
+        for summary in summaries:
+            tokens = count_tokens(summary, self.encoding_name) + 2
+            if groups[-1] and group_tokens + tokens > self.reduce_tokens:
+                groups.append([])
+                group_tokens = 0
+            groups[-1].append(summary)
+            group_tokens += tokens
+        return ["\n\n".join(group) for group in groups]
+
+    def start(self, content):
+        """
+        Begin summarizing a note and return (single, futures). A note that fits one
+        prompt gets its only call submitted right away (single=True); otherwise the
+        futures are the in-flight map calls over its chunks.
+        """
+        if count_tokens(content, self.encoding_name) <= self.final_tokens:
+            return True, [self.submit(self._final, content)]
+        return False, [self.submit(self._section, CHUNK_TEMPLATE, chunk)
+                       for chunk in split_chunks(content, self.chunk_tokens, self.encoding_name)]
+
+    def finish(self, started):
+        """Wait for the map stage, reduce level by level, and make the final call."""
+        single, futures = started
+        if single:
+            return futures[0].result()
+
+        summaries = [future.result() for future in futures]
+        while count_tokens("\n\n".join(summaries), self.encoding_name) > self.final_tokens:
+            groups = self._group(summaries)
+            if len(groups) == len(summaries) and len(groups) > 1:
+                # Each summary fills a reduce prompt on its own; pair them up so the level shrinks.
+                groups = ["\n\n".join(summaries[i:i + 2]) for i in range(0, len(summaries), 2)]
+            reduce_futures = [self.submit(self._section, REDUCE_TEMPLATE, group) for group in groups]
+            summaries = [future.result() for future in reduce_futures]
+            if len(summaries) == 1:
+                break
+        return self.submit(self._final, "\n\n".join(summaries)).result()
+
+    def summarize(self, content):
+        return self.finish(self.start(content))
+
+    def summarize_stream(self, items, window=4):
+        """
+        items yields (key, content). Yields (key, summary, error) in input order.
+        Up to `window` notes have their chunks in flight at once, so the map stage
+        of the next notes runs while the current one is being reduced.
+        """
+        pending = deque()
+
+        def finish_oldest():
+            key, started = pending.popleft()
+            try:
+                return key, self.finish(started), None
+            except Exception as e:
+                return key, None, e
+
+        for key, content in items:
+            pending.append((key, self.start(content)))
+            if len(pending) >= window:
+                yield finish_oldest()
+        while pending:
+            yield finish_oldest()
@@ -1,24 +1,20 @@
 import os
-from openai import OpenAI
-from dotenv import load_dotenv
-import tiktoken
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
 
-load_dotenv()
+from ai_service import cached_openai_chat, get_response_cache
+from md_summary.map_reduce import MapReduceSummarizer
 
 input_dir = '/Users/bogle/Dev/gitcode/chatgpt-markdown/outputv2'
 script_dir = os.path.dirname(os.path.abspath(__file__))
 output_md_file = os.path.join(script_dir, "summary.md")
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 MAX_CONTEXT_LENGTH = 4097
 # We'll set a desired completion length
 DESIRED_COMPLETION_TOKENS = 150
 
-# Use tiktoken to accurately count tokens
-def count_tokens(text, model="gpt-3.5-turbo-instruct"):
-    encoding = tiktoken.encoding_for_model(model)
-    return len(encoding.encode(text))
+# Concurrent requests to the API while summarizing the chunks of long notes
+MAX_WORKERS = 4
 
 prompt_template = """Please read the following text and produce a concise summary (1–2 sentences) that captures its main idea. 
 After the summary, provide a short list of relevant, topic-related hashtags (e.g., #Keyword, #Topic). 
@@ -31,42 +27,31 @@ with open(output_md_file, 'w') as md_file:
     md_file.write("| Filename | Summary |\n")
     md_file.write("|----------|---------|\n")
 
-for i, filename in enumerate(os.listdir(input_dir)):
-    if i >= 3:  # only process first 3 files
-        break
-    file_path = os.path.join(input_dir, filename)
-    print(f"file_path  {file_path}")
-    if os.path.isfile(file_path):
-        with open(file_path, 'r') as file:
-            content = file.read()
-
-        # Construct initial prompt
-        prompt = prompt_template.format(content)
-        
-        # Count tokens
-        prompt_tokens = count_tokens(prompt)
-
-        # If prompt + completion is too large, truncate
-        # We need prompt_tokens + DESIRED_COMPLETION_TOKENS <= MAX_CONTEXT_LENGTH
-        while prompt_tokens + DESIRED_COMPLETION_TOKENS > MAX_CONTEXT_LENGTH:
-            # Truncate content further. For example, remove last 10% of text
-            truncate_length = int(len(content) * 0.9)
-            content = content[:truncate_length]
-            prompt = prompt_template.format(content)
-            prompt_tokens = count_tokens(prompt)
-        
-        # Now send request
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": prompt_template},
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        summary = response.choices[0].message.content
+def iter_notes():
+    """Yield (filename, content) for the first 3 files in input_dir."""
+    for i, filename in enumerate(os.listdir(input_dir)):
+        if i >= 3:  # only process first 3 files
+            break
+        file_path = os.path.join(input_dir, filename)
+        print(f"file_path  {file_path}")
+        if os.path.isfile(file_path):
+            with open(file_path, 'r') as file:
+                yield filename, file.read()
+
+# Notes longer than the context window are summarized chunk by chunk (map) and the
+# chunk summaries merged (reduce) instead of being truncated. Every request goes
+# through the response cache, so an edited note only re-summarizes the changed chunks.
+with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+    summarizer = MapReduceSummarizer(partial(cached_openai_chat, "gpt-3.5-turbo"), executor.submit,
+                                     prompt_template, prompt_template,
+                                     MAX_CONTEXT_LENGTH, DESIRED_COMPLETION_TOKENS)
+    for filename, summary, error in summarizer.summarize_stream(iter_notes()):
+        if error is not None:
+            print(f"Error summarizing {filename}: {error}")
+            continue
 
         with open(output_md_file, 'a') as md_file:
             md_file.write(f"| {filename} | {summary} |\n")
 
-print(f"Summaries saved to {output_md_file}")
\ No newline at end of file
+print(get_response_cache().format_stats())
+print(f"Summaries saved to {output_md_file}")
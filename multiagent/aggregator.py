@@ -1,7 +1,7 @@
 # agents/aggregator.py
 
 
-from prompt_ollama_hashtag_aggregator import HashtagAggregator
+from multiagent.prompt_ollama_hashtag_aggregator import HashtagAggregator
 
 class AggregatorAgent:
     """
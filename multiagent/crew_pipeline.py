@@ -1,11 +1,11 @@
 # crew_pipeline.py
 
 import os
-from note_preprocessor import NotePreprocessorAgent
-from hashtag_generator import HashtagGeneratorAgent
-from link_extractor import LinkExtractorAgent
-from link_content_analyzer import LinkContentAnalyzerAgent
-from aggregator import AggregatorAgent
+from multiagent.note_preprocessor import NotePreprocessorAgent
+from multiagent.hashtag_generator import HashtagGeneratorAgent
+from multiagent.link_extractor import LinkExtractorAgent
+from multiagent.link_content_analyzer import LinkContentAnalyzerAgent
+from multiagent.aggregator import AggregatorAgent
 import ollama
 
 # Specify the AI model to use
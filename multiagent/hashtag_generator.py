@@ -1,6 +1,6 @@
 
 
-from prompt_ollama_hashtag_generator import HashtagGenerator
+from multiagent.prompt_ollama_hashtag_generator import HashtagGenerator
 
 
 class HashtagGeneratorAgent:
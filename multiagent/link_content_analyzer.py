@@ -1,7 +1,23 @@
-from tool_web_scrapper import WebpageScrapperTool
-from prompt_ollama_hashtag_generator import HashtagGenerator
-from tool_web_scrapperB import SeleniumScraper
-from tool_youtube_video_scrapper import YoutubeVideoScrapperTool
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_service import cached_chat
+from md_fileagent.prompt_budget import count_tokens
+from md_summary.map_reduce import MapReduceSummarizer
+from multiagent.tool_web_scrapper import WebpageScrapperTool
+from multiagent.prompt_ollama_hashtag_generator import HashtagGenerator, PROMPT_TEMPLATE
+from multiagent.tool_web_scrapperB import SeleniumScraper
+from multiagent.tool_youtube_video_scrapper import YoutubeVideoScrapperTool
+from multiagent.page_cache import PageCache
+
+TRANSCRIPT_TEMPLATE = """Summarize this video transcript in at most 8 sentences.
+Keep its topics, names and key terms.
+
+Transcript:
+{}
+"""
+
+TRANSCRIPT_SYSTEM_PROMPT = "You are a helpful and concise assistant that summarizes videos faithfully."
+
 
 class LinkContentAnalyzerAgent:
     """
@@ -11,10 +27,38 @@ class LinkContentAnalyzerAgent:
 
     def __init__(self, ollama_client , model_name):
         self.ollama_agent = ollama_client
-        self.web_scrapper_tool = WebpageScrapperTool()
+        # One page cache for both scrapers: the plain scraper reads pages the browser
+        # has rendered as well as its own downloads. Selenium, the fallback for pages
+        # the plain download couldn't read, reuses only its own renders.
+        self.page_cache = PageCache()
+        self.web_scrapper_tool = WebpageScrapperTool(self.page_cache)
         self._hashtag_generator = HashtagGenerator(ollama_client, model_name)
-        self.selenium_Scraper = SeleniumScraper()
+        self.selenium_Scraper = SeleniumScraper(self.page_cache)
         self.youtubeVideo_scrapper_tool = YoutubeVideoScrapperTool()
+        self.model_name = model_name
+        # Transcripts too long for the hashtag prompt are summarized chunk by chunk first.
+        self.executor = ThreadPoolExecutor(max_workers=2)
+        self.transcript_summarizer = MapReduceSummarizer(
+            self._chat, self.executor.submit, TRANSCRIPT_TEMPLATE, TRANSCRIPT_SYSTEM_PROMPT,
+            max_context_length=self._hashtag_generator.MAX_CONTEXT_LENGTH, completion_tokens=300
+        )
+        self.hashtag_prompt_tokens = (self._hashtag_generator.MAX_CONTEXT_LENGTH
+                                      - self._hashtag_generator.DESIRED_COMPLETION_TOKENS
+                                      - count_tokens(PROMPT_TEMPLATE.format("")))
+
+    def _chat(self, messages):
+        # Through the response cache, so a transcript is summarized once, not on every run.
+        response = cached_chat(model=self.model_name, messages=messages)
+        return response['message']['content']
+
+    def _video_content(self, url: str) -> str:
+        transcript = self.youtubeVideo_scrapper_tool.execute(url)
+        if transcript and count_tokens(transcript) > self.hashtag_prompt_tokens:
+            try:
+                return self.transcript_summarizer.summarize(transcript)
+            except Exception as e:
+                print(f"Error summarizing transcript {url}: {e}")
+        return transcript
 
     def _scrape_webpage(self, url: str) -> dict:
         try:
@@ -32,19 +76,24 @@ class LinkContentAnalyzerAgent:
         link_analysis = []
         link_based_hashtags = []
 
+        # All video transcripts of this note in one concurrent batch.
+        self.youtubeVideo_scrapper_tool.prefetch(
+            [link for link in valid_links if "youtu.be" in link or "youtube.com" in link]
+        )
+
         for link in valid_links:
 
             print('LinkContentAnalyzerAgent',link)
             # webpage_content = self._scrape_webpage(link)
 
             if "youtu.be" in link or "youtube.com" in link:
-                webpage_content = self.youtubeVideo_scrapper_tool.execute(link)
+                webpage_content = self._video_content(link)
             else:
                 webpage_content = self._scrape_webpage(link)
 
                 
             # Safely get the text from the scrapped data
-            if not webpage_content.strip():
+            if not webpage_content or not webpage_content.strip():
                 # If there's no text, skip or store empty data
                 link_analysis.append({
                     "url": link,
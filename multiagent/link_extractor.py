@@ -1,21 +1,17 @@
 
-import requests
+from multiagent.link_validator import LinkValidator
 
 class LinkExtractorAgent:
     """Validates links and returns active (safe) links."""
 
+    def __init__(self, validator=None):
+        # One validator for the whole run: pooled connections and a status cache
+        # shared by every note, so a link seen before isn't requested again.
+        self.validator = validator or LinkValidator()
+
     def run(self, links: list) -> dict:
-        valid_links = []
-        for link in links:
-            # Minimal check for link validity
-            try:
-                response = requests.head(link, timeout=5)
-                # changed for website throwing error 
-                if response.status_code < 500: 
-                    valid_links.append(link)
-            except:
-                # If invalid or request fails, ignore or store as broken
-                pass
+        # A status below 500 counts as valid (changed for websites throwing errors);
+        # failed requests are left out.
         return {
-            "valid_links": valid_links
-        }
\ No newline at end of file
+            "valid_links": self.validator.valid_links(links)
+        }
@@ -0,0 +1,185 @@
+# link_validator.py
+
+import time
+import sqlite3
+import argparse
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# A link answered with a status below this is kept (4xx often just means no bots).
+BROKEN_STATUS = 500
+DEFAULT_TTL_DAYS = 7
+# Timeouts and connection errors are often transient, so they are retried much sooner.
+FAILURE_TTL = 3600
+USER_AGENT = "Mozilla/5.0 (compatible; obsidian-link-validator)"
+
+
+def is_valid(status):
+    return status is not None and status < BROKEN_STATUS
+
+
+class LinkValidator:
+    """
+    Checks many links at once and remembers the answers.
+      - Requests run on a thread pool; each thread keeps its own requests.Session,
+        so connections to a host are reused (keep-alive) instead of reopened per link.
+      - At most per_host requests go to the same host at a time: each host's links
+        are split into per_host lanes checked one after another, so a busy host
+        never ties up more than per_host threads while other hosts wait.
+      - Results are cached in SQLite as (url, status, error, checked_at) and reused
+        until they are ttl seconds old, so a link that appears in many notes, or in
+        the next run, is checked once. Failed requests (no status) are only reused
+        for failure_ttl seconds.
+    """
+
+    def __init__(self, cache_path="link_status.db", ttl=DEFAULT_TTL_DAYS * 86400,
+                 max_workers=16, per_host=4, timeout=5, failure_ttl=FAILURE_TTL):
+        self.conn = sqlite3.connect(cache_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS link_status (
+                url TEXT PRIMARY KEY,
+                status INTEGER,
+                error TEXT,
+                checked_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self.ttl = ttl
+        self.failure_ttl = min(failure_ttl, ttl)
+        self.per_host = per_host
+        self.timeout = timeout
+        # Kept across validate() calls so the threads' sessions and their connections live on.
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.local = threading.local()
+
+    def session(self):
+        """This thread's session, with a connection pool sized for per_host connections."""
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=self.per_host)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers["User-Agent"] = USER_AGENT
+            self.local.session = session
+        return session
+
+    def fetch_status(self, url):
+        """(status, error) for one URL: HEAD, or a streamed GET for servers that refuse HEAD."""
+        try:
+            session = self.session()
+            response = session.head(url, timeout=self.timeout, allow_redirects=True)
+            if response.status_code in (403, 405, 501):
+                response = session.get(url, timeout=self.timeout, allow_redirects=True, stream=True)
+                response.close()
+            return response.status_code, None
+        except requests.RequestException as e:
+            return None, type(e).__name__
+        except ValueError as e:
+            # requests rejects some malformed URLs before sending anything.
+            return None, str(e)
+
+    def check_lane(self, urls):
+        """Check urls (all on one host) one after another."""
+        return [(url, self.fetch_status(url)) for url in urls]
+
+    def lanes(self, urls):
+        """
+        Split urls into lists checked in parallel, at most per_host per host.
+        The longest lanes come first so they don't finish last.
+        """
+        by_host = {}
+        for url in urls:
+            by_host.setdefault(urlsplit(url).netloc.lower(), []).append(url)
+        lanes = [host_urls[i::self.per_host] for host_urls in by_host.values()
+                 for i in range(min(self.per_host, len(host_urls)))]
+        return sorted(lanes, key=len, reverse=True)
+
+    def cached(self, urls, now):
+        """{url: (status, error)} for the urls with a fresh cache entry."""
+        fresh = {}
+        cursor = self.conn.cursor()
+        urls = list(urls)
+        # Stay under SQLite's bound-parameter limit.
+        for i in range(0, len(urls), 500):
+            batch = urls[i:i + 500]
+            cursor.execute(f"""
+                SELECT url, status, error FROM link_status
+                WHERE url IN ({",".join("?" * len(batch))})
+                  AND checked_at >= CASE WHEN status IS NULL THEN ? ELSE ? END
+            """, batch + [now - self.failure_ttl, now - self.ttl])
+            for url, status, error in cursor.fetchall():
+                fresh[url] = (status, error)
+        return fresh
+
+    def validate(self, urls):
+        """Return {url: (status, error)} for every url; status is None when the request failed."""
+        now = time.time()
+        urls = list(dict.fromkeys(urls))
+        results = self.cached(urls, now)
+        pending = [url for url in urls if url not in results]
+        if not pending:
+            return results
+
+        checked = {}
+        for lane_results in self.executor.map(self.check_lane, self.lanes(pending)):
+            checked.update(lane_results)
+
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO link_status (url, status, error, checked_at) VALUES (?, ?, ?, ?)",
+                [(url, status, error, now) for url, (status, error) in checked.items()]
+            )
+        results.update(checked)
+        return results
+
+    def valid_links(self, urls):
+        """The urls that answered with a usable status, in their original order."""
+        results = self.validate(urls)
+        return [url for url in urls if is_valid(results[url][0])]
+
+    def close(self):
+        self.executor.shutdown()
+        self.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check every link in the link index, with a status cache.")
+    parser.add_argument("--db", default="obsidian_index.db", help="Database with the links table (md_links.link_index)")
+    parser.add_argument("--cache", default="link_status.db")
+    parser.add_argument("--ttl-days", type=float, default=DEFAULT_TTL_DAYS)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--per-host", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=5)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT l.url, f.path, l.line FROM links l JOIN files f ON f.id = l.file_id
+        WHERE f.deleted = 0 ORDER BY f.path, l.line
+    """)
+    occurrences = cursor.fetchall()
+    conn.close()
+
+    validator = LinkValidator(args.cache, args.ttl_days * 86400, args.workers, args.per_host, args.timeout)
+    start = time.perf_counter()
+    results = validator.validate(url for url, _, _ in occurrences)
+    elapsed = time.perf_counter() - start
+    validator.close()
+
+    broken = 0
+    for url, path, line in occurrences:
+        status, error = results[url]
+        if not is_valid(status):
+            broken += 1
+            print(f"{status or error}  {path}:{line}  {url}")
+    print(f"Checked {len(results)} distinct links in {elapsed:.1f}s, {broken} broken link(s) in notes.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+# page_cache.py
+
+import time
+import zlib
+import queue
+import atexit
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import requests
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# Pages fetched more recently than this are served without asking the server.
+DEFAULT_MAX_AGE = 24 * 3600
+USER_AGENT = "Mozilla/5.0 (compatible; obsidian-link-analyzer)"
+
+
+class PageCache:
+    """
+    Fetched pages keyed by URL, shared by the scrapers so a page is downloaded once.
+      - kind "http" holds the response body of a plain GET; once it is older than
+        max_age it is revalidated with If-None-Match / If-Modified-Since, and a 304
+        costs no body.
+      - kind "browser" holds the page source rendered by a browser (no validators,
+        simply refetched after max_age).
+    page() serves either: a fresh browser render is used in place of a download, so
+    a page the browser scraper has seen costs the plain scraper no request.
+    Bodies are zlib-compressed; past max_bytes the least recently used pages go.
+    Each thread uses its own requests.Session.
+    """
+
+    def __init__(self, cache_path="page_cache.db", max_bytes=DEFAULT_MAX_BYTES,
+                 max_age=DEFAULT_MAX_AGE, timeout=10):
+        self.conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                content BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (url, kind)
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pages_last_used ON pages(last_used)")
+        self.conn.commit()
+        self.lock = threading.Lock()
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.timeout = timeout
+        self.local = threading.local()
+        self.sessions = []
+
+    def session(self):
+        """This thread's session; requests.Session isn't safe to share between threads."""
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = requests.Session()
+            session.headers["User-Agent"] = USER_AGENT
+            self.local.session = session
+            with self.lock:
+                self.sessions.append(session)
+        return session
+
+    def lookup(self, url, kind):
+        """(content, etag, last_modified, fetched_at) for a cached page, or None."""
+        with self.lock:
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT content, etag, last_modified, fetched_at FROM pages WHERE url = ? AND kind = ?
+            """, (url, kind))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            with self.conn:
+                cursor.execute("UPDATE pages SET last_used = ? WHERE url = ? AND kind = ?", (time.time(), url, kind))
+        return zlib.decompress(row[0]), row[1], row[2], row[3]
+
+    def store(self, url, kind, content, etag=None, last_modified=None):
+        compressed = zlib.compress(content)
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("""
+                INSERT OR REPLACE INTO pages (url, kind, content, size, etag, last_modified, fetched_at, last_used)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (url, kind, compressed, len(compressed), etag, last_modified, now, now))
+            self.evict()
+
+    def touch(self, url, kind):
+        """Mark a cached page as just revalidated."""
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE pages SET fetched_at = ?, last_used = ? WHERE url = ? AND kind = ?",
+                              (now, now, url, kind))
+
+    def evict(self):
+        """Drop least recently used pages until the cache fits in max_bytes. Caller holds the lock."""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT COALESCE(SUM(size), 0) FROM pages")
+        excess = cursor.fetchone()[0] - self.max_bytes
+        if excess <= 0:
+            return
+        cursor.execute("SELECT url, kind, size FROM pages ORDER BY last_used")
+        doomed = []
+        for url, kind, size in cursor.fetchall():
+            if excess <= 0:
+                break
+            doomed.append((url, kind))
+            excess -= size
+        cursor.executemany("DELETE FROM pages WHERE url = ? AND kind = ?", doomed)
+
+    def fetch(self, url):
+        """
+        The body of url as bytes, from the cache when it is fresh or the server
+        answers 304, otherwise downloaded and cached. Raises requests.RequestException
+        like requests.get(...).raise_for_status() would.
+        """
+        cached = self.lookup(url, "http")
+        if cached is not None:
+            content, etag, last_modified, fetched_at = cached
+            if time.time() - fetched_at < self.max_age:
+                return content
+            headers = {}
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+            response = self.session().get(url, timeout=self.timeout, headers=headers)
+            if response.status_code == 304:
+                self.touch(url, "http")
+                return content
+        else:
+            response = self.session().get(url, timeout=self.timeout)
+
+        response.raise_for_status()
+        self.store(url, "http", response.content,
+                   response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response.content
+
+    def page(self, url):
+        """
+        The HTML of url as bytes: a browser render cached within max_age if there is
+        one, since it holds everything the plain download would, else fetch(url).
+        """
+        html = self.cached_render(url)
+        if html is not None:
+            return html.encode("utf-8")
+        return self.fetch(url)
+
+    def cached_render(self, url):
+        """Browser-rendered page source for url if cached within max_age, else None."""
+        cached = self.lookup(url, "browser")
+        if cached is None or time.time() - cached[3] >= self.max_age:
+            return None
+        return cached[0].decode("utf-8", errors="replace")
+
+    def store_render(self, url, html):
+        self.store(url, "browser", html.encode("utf-8"))
+
+    def close(self):
+        for session in self.sessions:
+            session.close()
+        self.conn.close()
+
+
+class BrowserPool:
+    """
+    Up to `size` warm browser instances shared by every scrape. A browser is
+    started the first time it is needed, handed out with acquire() and put back
+    afterwards instead of being quit, and replaced after max_uses pages or when a
+    page load fails with it. All browsers are quit at close() or interpreter exit.
+    """
+
+    def __init__(self, factory, size=2, max_uses=50):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.idle = queue.Queue()
+        self.started = 0
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def checkout(self):
+        while True:
+            try:
+                return self.idle.get_nowait()
+            except queue.Empty:
+                pass
+            with self.lock:
+                start_new = self.started < self.size
+                if start_new:
+                    self.started += 1
+            if start_new:
+                try:
+                    return [self.factory(), 0]
+                except Exception:
+                    with self.lock:
+                        self.started -= 1
+                    raise
+            # Wait for a browser to come back, but look again now and then: one that
+            # is retired instead frees a slot to start a new browser in.
+            try:
+                return self.idle.get(timeout=1)
+            except queue.Empty:
+                pass
+
+    def retire(self, entry):
+        with self.lock:
+            self.started -= 1
+        try:
+            entry[0].quit()
+        except Exception:
+            pass
+
+    @contextmanager
+    def acquire(self):
+        entry = self.checkout()
+        try:
+            yield entry[0]
+        except Exception:
+            self.retire(entry)
+            raise
+        entry[1] += 1
+        if entry[1] >= self.max_uses:
+            self.retire(entry)
+        else:
+            self.idle.put(entry)
+
+    def close(self):
+        while True:
+            try:
+                entry = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            self.retire(entry)
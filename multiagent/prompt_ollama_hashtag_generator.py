@@ -1,6 +1,6 @@
 # prompt_ollama_hashtag_generator
 
-import tiktoken
+from md_fileagent.prompt_budget import fit_prompt
 
 PROMPT_TEMPLATE = """Please analyze the following text and strictly follow these instructions:
 1. Purpose:
@@ -22,10 +22,6 @@ class HashtagGenerator:
         self.MAX_CONTEXT_LENGTH = max_context_length
         self.DESIRED_COMPLETION_TOKENS = desired_completion_tokens
 
-    def _count_tokens(self, text: str, model="cl100k_base"):
-        encoding = tiktoken.get_encoding(model)
-        return len(encoding.encode(text))
-    
     def _remove_single_hash_tags(self, hashtags: list[str]) -> list[str]:
         """
         Removes any entries that are literally just '#'.
@@ -46,15 +42,9 @@ class HashtagGenerator:
         using an Ollama model with the specified prompt template.
         """
 
-        prompt = PROMPT_TEMPLATE.format(content)
-        prompt_tokens = self._count_tokens(prompt)
-
-        # Truncate content if needed to stay within token limit
-        while (prompt_tokens + self.DESIRED_COMPLETION_TOKENS) > self.MAX_CONTEXT_LENGTH:
-            truncate_length = int(len(content) * 0.9)
-            content = content[:truncate_length]
-            prompt = PROMPT_TEMPLATE.format(content)
-            prompt_tokens = self._count_tokens(prompt)
+        # Pack the most useful sections into the token budget left by the template
+        prompt = fit_prompt(PROMPT_TEMPLATE, content, self.MAX_CONTEXT_LENGTH,
+                            self.DESIRED_COMPLETION_TOKENS, content_key=None)
 
         messages = [
             {
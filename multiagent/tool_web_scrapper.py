@@ -3,7 +3,12 @@ from bs4 import BeautifulSoup
 from urllib.parse import urlparse
 from newspaper import Article
 
+from multiagent.page_cache import PageCache
+
 class WebpageScrapperTool:
+    def __init__(self, page_cache=None):
+        self.page_cache = page_cache or PageCache()
+
     def execute(self, url="", **kwargs):
         if not url:
             print("No URL provided.")
@@ -16,18 +21,18 @@ class WebpageScrapperTool:
                 print("Invalid URL format.")
                 return
             
-            # Fetch webpage content
-            response = requests.get(url, timeout=10)
-            response.raise_for_status()
+            # Fetch webpage content (cached, revalidated with ETag / Last-Modified),
+            # or the page as the browser scraper last rendered it
+            html = self.page_cache.page(url)
 
-            # Use newspaper3k for article extraction
+            # Use newspaper3k for article extraction on the same HTML, no second download
             article = Article(url)
-            article.download()
+            article.download(input_html=html.decode('utf-8', errors='replace'))
             article.parse()
 
             # If it's not an article, fall back to BeautifulSoup
             if not article.text:
-                soup = BeautifulSoup(response.content, 'html.parser')
+                soup = BeautifulSoup(html, 'html.parser')
                 text_content = ' '.join(soup.stripped_strings)
             else:
                 text_content = article.text
@@ -5,30 +5,40 @@ from selenium.webdriver.chrome.options import Options
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 
+from multiagent.page_cache import BrowserPool
+
 
 class SeleniumScraper:
-    def __init__(self):
+    def __init__(self, page_cache=None, pool_size=2):
         load_dotenv()  
         self.driver_path = 'multiagent/chromedriver'
-        
+        self.page_cache = page_cache
+        # Warm headless Chrome instances reused across URLs instead of one launch per page.
+        self.browser_pool = BrowserPool(self.start_browser, size=pool_size)
+
+    def start_browser(self):
+        print("Starting headless Chrome...")
+        options = Options()
+        options.add_argument("--headless") 
+        service = Service(executable_path=self.driver_path)
+        return webdriver.Chrome(service=service, options=options)
 
     def scrape_website(self, website):
-        print("Connecting to Scraping Browser...")
+        if self.page_cache:
+            html = self.page_cache.cached_render(website)
+            if html is not None:
+                return html
         try:
-            options = Options()
-            options.add_argument("--headless") 
-            service = Service(executable_path=self.driver_path)
-            driver = webdriver.Chrome(service=service, options=options)
-
-
-            driver.get(website)
-            print("Navigated! Scraping page content...")
-            html = driver.page_source
-            return html
+            with self.browser_pool.acquire() as driver:
+                driver.get(website)
+                print("Navigated! Scraping page content...")
+                html = driver.page_source
         except Exception as e:
                 print(f"Error processing specific file: {e}")
-        finally:
-            driver.quit()
+                return None
+        if self.page_cache:
+            self.page_cache.store_render(website, html)
+        return html
 
     @staticmethod
     def extract_body_content(html_content):
@@ -1,31 +1,43 @@
-from youtube_transcript_api import YouTubeTranscriptApi
+from multiagent.transcript_store import TranscriptFetcher, video_id, youtube_transcript
 
 class YoutubeVideoScrapperTool:
 
+    def __init__(self, fetcher=None, provider=youtube_transcript):
+        # Transcripts are kept on disk by video id; provider is only asked for new videos.
+        self.fetcher = fetcher or TranscriptFetcher(provider=provider)
+        self.transcripts = {}
+
     def getVideoID(self, url: str) -> str:
         """
         This function gets the video ID from the URL provided by the user.
         """
-        try:
-            if "youtu.be" in url:
-                return url.split("/")[-1]
-            elif "youtube.com" in url:
-                return url.split("v=")[1].split("&")[0]
-            else:
-                raise ValueError("Invalid YouTube URL format.")
-        except IndexError:
-            raise ValueError("Invalid YouTube URL format.")
+        return video_id(url)
 
-    def get_transcription(self, video_id: str) -> dict:
+    def get_transcription(self, video_id: str) -> str:
         """
-        Gets the transcript of the video directly from YouTube (default=en).
-        Returns a dictionary.
+        Gets the transcript of the video, from the transcript store or else
+        directly from YouTube (default=en).
         """
+        if video_id in self.transcripts:
+            return self.transcripts[video_id]
         try:
-            transcript = YouTubeTranscriptApi.get_transcript(video_id)
-            return " ".join([entry['text'] for entry in transcript])
+            transcript = self.fetcher.fetch_one(video_id)
         except Exception as e:
             raise RuntimeError(f"Failed to fetch transcription: {e}")
+        self.transcripts[video_id] = transcript
+        return transcript
+
+    def prefetch(self, urls: list):
+        """
+        Fetch the transcripts of all video links of a run at once, concurrently,
+        so execute() on each of them is answered from memory. Returns {url: error}
+        for the links that failed; execute() tries those once more on its own.
+        """
+        transcripts, errors = self.fetcher.fetch_all(urls)
+        self.transcripts.update(transcripts)
+        for url, error in errors.items():
+            print(f"Could not prefetch transcript for {url}: {error}")
+        return errors
 
     def execute(self, url: str = ""):
         """
@@ -39,7 +51,7 @@ class YoutubeVideoScrapperTool:
             video_id = self.getVideoID(url)
             transcript = self.get_transcription(video_id)
 
-            print('YoutubeVideoScrapperTool:', transcript)
+            print('YoutubeVideoScrapperTool:', transcript[:200])
             return transcript
 
         except Exception as e:
@@ -50,7 +62,8 @@ class YoutubeVideoScrapperTool:
 if __name__ == "__main__":
     scraper = YoutubeVideoScrapperTool()
     url = "https://www.youtube.com/watch?v=Oo8-nEuDBkk"
+    urv2 = 'https://youtu.be/argpSxB1NQE?si=djxfU0ObgHatQU7Q&t=6003'
+    scraper.prefetch([url, urv2])
     scraper.execute(url)
     print('------------')
-    urv2 = 'https://youtu.be/argpSxB1NQE?si=djxfU0ObgHatQU7Q&t=6003'
-    scraper.execute(url)
\ No newline at end of file
+    scraper.execute(urv2)
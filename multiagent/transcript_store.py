@@ -0,0 +1,124 @@
+# transcript_store.py
+
+import os
+import re
+import gzip
+import tempfile
+from urllib.parse import urlsplit, parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+video_id_pattern = re.compile(r'^[A-Za-z0-9_-]{11}$')
+YOUTUBE_HOSTS = {"youtube.com", "m.youtube.com", "music.youtube.com", "youtube-nocookie.com"}
+# youtube.com/<prefix>/<id> forms
+PATH_PREFIXES = ("embed", "shorts", "live", "v")
+
+
+def video_id(url: str) -> str:
+    """
+    The canonical 11-character video id of a YouTube link, ignoring query strings
+    and fragments (youtu.be/<id>?si=...&t=...), for watch, youtu.be, shorts, embed
+    and live links. Raises ValueError for anything else.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    segments = [segment for segment in parts.path.split("/") if segment]
+
+    candidate = None
+    if host == "youtu.be" and segments:
+        candidate = segments[0]
+    elif host in YOUTUBE_HOSTS:
+        if segments[:1] == ["watch"]:
+            candidate = parse_qs(parts.query).get("v", [None])[0]
+        elif len(segments) >= 2 and segments[0] in PATH_PREFIXES:
+            candidate = segments[1]
+
+    if not candidate or not video_id_pattern.match(candidate):
+        raise ValueError(f"Invalid YouTube URL format: {url}")
+    return candidate
+
+
+def youtube_transcript(video_id: str) -> str:
+    """Fetch the transcript of a video from YouTube (default=en) as one string."""
+    from youtube_transcript_api import YouTubeTranscriptApi
+
+    transcript = YouTubeTranscriptApi.get_transcript(video_id)
+    return " ".join([entry['text'] for entry in transcript])
+
+
+class TranscriptStore:
+    """Transcripts on disk, one gzip file per video id, so a video is fetched once."""
+
+    def __init__(self, directory="youtube_transcripts"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, video_id):
+        return os.path.join(self.directory, f"{video_id}.txt.gz")
+
+    def get(self, video_id):
+        try:
+            with gzip.open(self.path(video_id), "rt", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, video_id, transcript):
+        # Write then rename, so a concurrent reader never sees half a file.
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+                f.write(transcript)
+            os.replace(tmp_path, self.path(video_id))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+class TranscriptFetcher:
+    """
+    Transcripts for many video links at once: links are reduced to distinct video
+    ids, stored transcripts are read from the TranscriptStore, and the rest are
+    fetched concurrently with provider(video_id) -> str and stored.
+    provider defaults to YouTube; pass a stand-in to run without the network.
+    """
+
+    def __init__(self, store=None, provider=youtube_transcript, max_workers=4):
+        self.store = store or TranscriptStore()
+        self.provider = provider
+        self.max_workers = max_workers
+
+    def fetch_one(self, video_id):
+        transcript = self.store.get(video_id)
+        if transcript is None:
+            transcript = self.provider(video_id)
+            self.store.put(video_id, transcript)
+        return transcript
+
+    def fetch_all(self, urls):
+        """
+        Return ({video_id: transcript}, {url: error}) for the urls. Links to the
+        same video share one fetch; a failing video doesn't stop the others.
+        """
+        errors = {}
+        urls_by_id = {}
+        for url in urls:
+            try:
+                urls_by_id.setdefault(video_id(url), []).append(url)
+            except ValueError as e:
+                errors[url] = e
+
+        missing = [vid for vid in urls_by_id if not os.path.exists(self.store.path(vid))]
+        transcripts = {vid: self.store.get(vid) for vid in urls_by_id if vid not in missing}
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {vid: executor.submit(self.fetch_one, vid) for vid in missing}
+            for vid, future in futures.items():
+                try:
+                    transcripts[vid] = future.result()
+                except Exception as e:
+                    for url in urls_by_id[vid]:
+                        errors[url] = e
+        return transcripts, errors
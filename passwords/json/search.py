@@ -1,31 +1,13 @@
-import json
 import os
+import sys
 
-# Step 1: Load the JSON file
-json_file = "bitwarden_export_20241207182233.json"
-
-with open(json_file, "r", encoding="utf-8") as file:
-    data = json.load(file)
-
-# Step 2: Extract passwords from the JSON structure
-passwords = [item["login"]["password"] for item in data["items"] if item.get("login") and item["login"].get("password")]
-
-# print(f"passwords-{passwords}")
-
-
-# Step 3: Loop through `.md` files and search for passwords
-def search_passwords_in_md_files(directory, passwords):
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".md"):
-                file_path = os.path.join(root, file)
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    for password in passwords:
-                        if password in content:
-                            print(f"Password found in file: {file_path}")
-                            print(f"Password: {password}\n")
+# Run in place (cd passwords/json); the scanner lives one directory up.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from secret_scanner import SecretScanner, load_bitwarden_json, report
 
+# Step 1: Load the JSON file and extract the passwords
+json_file = "bitwarden_export_20241207182233.json"
+credentials = load_bitwarden_json(json_file)
 
 # Specify the directory containing the `.md` files
 directory_to_search = "/Users/bogle/Dev/obsidian/Bogle"
@@ -35,5 +17,5 @@ if not os.path.exists(directory_to_search):
 else:
     print(f"Directory found: {directory_to_search}")
 
-# Call the function
-search_passwords_in_md_files(directory_to_search, passwords)
\ No newline at end of file
+# Step 2: One pass over every `.md` file with all passwords compiled into one automaton
+report(SecretScanner(credentials), directory_to_search)
@@ -1,23 +1,17 @@
-import csv
 import os
 
+from secret_scanner import SecretScanner, load_password_csv, report
+
 # List of passwords to exclude (in lowercase)
 excluded_passwords = ["bogle", "***", "2793", "11412", "123456"]
 
-# Step 1: Load the CSV files, excluding any passwords in the excluded_passwords list
+# Step 1: Load the CSV files
 csv_files = ["oneil Chrome Passwords.csv", "work Chrome Passwords.csv", "Google Passwords.csv"]
-passwords = []
+credentials = []
 
 for csv_file in csv_files:
     try:
-        with open(csv_file, "r", encoding="utf-8") as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                # Assuming the CSV headers include: name, url, username, password, note
-                password_value = row.get("password")
-                # Exclude the password if it exists in the excluded_passwords list (case-insensitive)
-                if password_value and password_value.lower() not in excluded_passwords:
-                    passwords.append(password_value)
+        credentials.extend(load_password_csv(csv_file))
     except Exception as e:
         print(f"Error reading {csv_file}: {e}")
 
@@ -32,28 +26,6 @@ excluded_files = [
     "Bogle/4. Archives/Evernote/nians notebook/Learn akashx Trading.md"
 ]
 
-# Step 2: Loop through `.md` files and search for passwords, excluding specified files
-def search_passwords_in_md_files(directory, passwords):
-    # Get the parent directory so that relative paths match the exclusion list
-    parent_dir = os.path.dirname(directory)
-    
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith(".md"):
-                file_path = os.path.join(root, file)
-                # Compute the relative path from the parent directory
-                rel_path = os.path.relpath(file_path, parent_dir)
-                # Skip the file if it is in the exclusion list
-                if rel_path in excluded_files:
-                    continue
-                
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                    for password in passwords:
-                        if password in content:
-                            print(f"Password found in file: {file_path}")
-                            print(f"Password: {password}\n")
-
 # Specify the directory containing the `.md` files
 directory_to_search = "/Users/bogle/Dev/obsidian/Bogle"
 
@@ -62,5 +34,7 @@ if not os.path.exists(directory_to_search):
 else:
     print(f"Directory found: {directory_to_search}")
 
-# Call the function
-search_passwords_in_md_files(directory_to_search, passwords)
\ No newline at end of file
+# Step 2: One pass over every `.md` file, excluding specified files and passwords
+# (case-insensitive), with all passwords compiled into one automaton
+scanner = SecretScanner(credentials, excluded_passwords)
+report(scanner, directory_to_search, excluded_files)
@@ -0,0 +1,228 @@
+import os
+import csv
+import json
+import mmap
+import time
+import argparse
+from collections import deque
+
+# Every credential is searched for, however short, as the old scripts did. Raise it
+# (--min-length 4) to skip secrets like "123" that match everywhere.
+MIN_SECRET_LENGTH = 1
+# Files are translated and scanned this many bytes at a time.
+BLOCK_SIZE = 1 << 20
+
+
+def load_bitwarden_json(json_file):
+    """Return [(password, label)] from a Bitwarden JSON export."""
+    with open(json_file, "r", encoding="utf-8") as file:
+        data = json.load(file)
+    credentials = []
+    for item in data.get("items", []):
+        login = item.get("login") or {}
+        if login.get("password"):
+            label = item.get("name") or ""
+            if login.get("username"):
+                label = f"{label} ({login['username']})"
+            credentials.append((login["password"], f"{os.path.basename(json_file)}: {label}"))
+    return credentials
+
+
+def load_password_csv(csv_file):
+    """Return [(password, label)] from a Chrome / Google Passwords CSV export (name,url,username,password,note)."""
+    credentials = []
+    with open(csv_file, "r", encoding="utf-8") as file:
+        for row in csv.DictReader(file):
+            if row.get("password"):
+                label = row.get("name") or row.get("url") or ""
+                if row.get("username"):
+                    label = f"{label} ({row['username']})"
+                credentials.append((row["password"], f"{os.path.basename(csv_file)}: {label}"))
+    return credentials
+
+
+def mask(secret):
+    # Short secrets are hidden completely; two characters would give them away.
+    shown = secret[:2] if len(secret) > 4 else ""
+    return shown + "*" * max(3, len(secret) - len(shown))
+
+
+class Automaton:
+    """
+    Aho-Corasick automaton over a set of byte strings, compiled to a full DFA.
+    Bytes that occur in no secret share one class (via bytes.translate), so each
+    state's transition row is a short list and scanning is one list lookup per
+    byte, whatever the number of secrets.
+    """
+
+    def __init__(self, secrets):
+        alphabet = sorted({byte for secret in secrets for byte in secret})
+        classes = bytearray(256)
+        for index, byte in enumerate(alphabet, start=1):
+            classes[byte] = index
+        self.table = bytes(classes)
+        width = len(alphabet) + 1
+
+        # The trie: goto[state] = {class: next state}, outputs[state] = secrets ending here.
+        goto = [{}]
+        self.outputs = [()]
+        for secret in secrets:
+            state = 0
+            for byte in secret.translate(self.table):
+                next_state = goto[state].get(byte)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][byte] = next_state
+                    goto.append({})
+                    self.outputs.append(())
+                state = next_state
+            self.outputs[state] += (secret,)
+
+        # Breadth-first, each state's row is its failure state's row plus its own
+        # trie edges, and it inherits the secrets its failure state reports.
+        fail = [0] * len(goto)
+        self.delta = [None] * len(goto)
+        self.delta[0] = [0] * width
+        for byte, next_state in goto[0].items():
+            self.delta[0][byte] = next_state
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            row = list(self.delta[fail[state]])
+            for byte, next_state in goto[state].items():
+                if state:
+                    fail[next_state] = self.delta[fail[state]][byte]
+                self.outputs[next_state] += self.outputs[fail[next_state]]
+                row[byte] = next_state
+                queue.append(next_state)
+            self.delta[state] = row
+
+    def __len__(self):
+        return len(self.delta)
+
+    def scan(self, data, block_size=BLOCK_SIZE):
+        """Yield (start offset, secret) for every occurrence in data (bytes or mmap), overlaps included."""
+        delta = self.delta
+        outputs = self.outputs
+        state = 0
+        for block_start in range(0, len(data), block_size):
+            block = data[block_start:block_start + block_size].translate(self.table)
+            for i, byte in enumerate(block):
+                state = delta[state][byte]
+                if outputs[state]:
+                    end = block_start + i + 1
+                    for secret in outputs[state]:
+                        yield end - len(secret), secret
+
+
+class SecretScanner:
+    """
+    Finds any of a set of known secrets in files in one pass per file: all
+    secrets go into a single Aho-Corasick automaton, each file is memory-mapped
+    and fed through it once, and every hit is reported with its line number and
+    the credential(s) it belongs to.
+    """
+
+    def __init__(self, credentials, excluded_secrets=(), min_length=MIN_SECRET_LENGTH):
+        excluded = {secret.lower() for secret in excluded_secrets}
+        self.labels = {}
+        self.too_short = 0
+        for secret, label in credentials:
+            if secret.lower() in excluded:
+                continue
+            if len(secret) < min_length:
+                self.too_short += 1
+                continue
+            self.labels.setdefault(secret.encode("utf-8"), []).append(label)
+        self.automaton = Automaton(self.labels)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def scan_bytes(self, data):
+        """Yield (line, secret, labels) for every secret found in data (bytes or mmap)."""
+        line = 1
+        last = 0
+        for start, secret in self.automaton.scan(data):
+            # Hits come in order of their end, so a start can be before the last one.
+            if start >= last:
+                line += data[last:start].count(b"\n")
+            else:
+                line -= data[start:last].count(b"\n")
+            last = start
+            yield line, secret.decode("utf-8", errors="replace"), self.labels[secret]
+
+    def scan_file(self, file_path):
+        """Return [(line, secret, labels)] for one file."""
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return []
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return list(self.scan_bytes(data))
+
+    def scan_directory(self, directory, excluded_files=(), extension=".md"):
+        """
+        Yield (file_path, line, secret, labels) for every hit under directory.
+        excluded_files are paths relative to directory's parent, as in the old scripts.
+        """
+        parent_dir = os.path.dirname(directory)
+        excluded_files = set(excluded_files)
+        for root, _, files in os.walk(directory):
+            for file in files:
+                if not file.endswith(extension):
+                    continue
+                file_path = os.path.join(root, file)
+                if os.path.relpath(file_path, parent_dir) in excluded_files:
+                    continue
+                try:
+                    hits = self.scan_file(file_path)
+                except (OSError, ValueError) as e:
+                    print(f"Could not read file {file_path}: {e}")
+                    continue
+                for line, secret, labels in hits:
+                    yield file_path, line, secret, labels
+
+
+def report(scanner, directory, excluded_files=(), show_secrets=False):
+    """Print every hit grouped by file and return the list of files with secrets."""
+    if scanner.too_short:
+        print(f"Skipping {scanner.too_short} credentials shorter than the minimum length.")
+    start = time.perf_counter()
+    files_with_secrets = []
+    for file_path, line, secret, labels in scanner.scan_directory(directory, excluded_files):
+        if not files_with_secrets or files_with_secrets[-1] != file_path:
+            files_with_secrets.append(file_path)
+            print(f"Password found in file: {file_path}")
+        shown = secret if show_secrets else mask(secret)
+        print(f"  line {line}: {shown}  <- {'; '.join(labels)}")
+    print(f"Scanned for {len(scanner)} secrets in {time.perf_counter() - start:.1f}s, "
+          f"{len(files_with_secrets)} files with matches.")
+    return files_with_secrets
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find exported passwords in Markdown notes.")
+    parser.add_argument("directory", nargs="?", default="/Users/bogle/Dev/obsidian/Bogle")
+    parser.add_argument("--bitwarden", nargs="*", default=[], help="Bitwarden JSON exports")
+    parser.add_argument("--csv", nargs="*", default=[], help="Chrome / Google Passwords CSV exports")
+    parser.add_argument("--exclude-password", nargs="*", default=[], help="Secrets to ignore (case-insensitive)")
+    parser.add_argument("--min-length", type=int, default=MIN_SECRET_LENGTH)
+    parser.add_argument("--show", action="store_true", help="Print matched passwords in full instead of masked")
+    args = parser.parse_args()
+
+    credentials = []
+    for json_file in args.bitwarden:
+        credentials.extend(load_bitwarden_json(json_file))
+    for csv_file in args.csv:
+        credentials.extend(load_password_csv(csv_file))
+
+    if not os.path.exists(args.directory):
+        print(f"Directory does not exist: {args.directory}")
+        return
+
+    scanner = SecretScanner(credentials, args.exclude_password, args.min_length)
+    report(scanner, args.directory, show_secrets=args.show)
+
+
+if __name__ == '__main__':
+    main()
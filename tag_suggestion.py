@@ -1,11 +1,11 @@
 import os
 import sqlite3
+import argparse
 import logging
 from datetime import datetime
 
 
-from ai_service import OllamaService , OpenAIService
-from md_fileagent.tag_prompt import tag_prompt , tag_prompt_oldtags , new_tag_prompt , new_tag_promptv2
+from md_fileagent.tag_prompt import tag_prompt , tag_prompt_oldtags , new_tag_prompt , new_tag_promptv2 , combined_tag_prompt
 from md_fileagent.tag_list import tag_list , tag_cleaner , tag_cleanerv2
 from md_fileagent.tag_sqlite import check_for_ai_suggestions , add_file_with_tags , initialize_db , add_file , select_all_db , update_file_with_tags
 from md_fileagent.yaml_constructor import update_frontmatter, create_frontmatter , has_frontmatter
@@ -13,20 +13,13 @@ from md_fileagent.utility import get_date_time
 from md_fileagent.file_writer import update_file , get_file_content, get_all_files, get_filename , get_file_path
 from md_fileagent.git_helper import files_added , files_changed , get_files_modified
 from md_fileagent.tag_daemonv2 import start_process
-from pydantic import BaseModel
 
-class TagModel(BaseModel):
-    tag1: str
-    tag2: str
-    tag3: str
+# ai_service and the pydantic tag models are imported where a model is called,
+# so a run with nothing to tag never loads the model clients.
 
-# Set up logging to file.
-logging.basicConfig(
-    filename='app.log',          # Log file name
-    filemode='a',                # Append mode (use 'w' to overwrite)
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    level=logging.INFO           # Minimum log level to capture
-)
+# "combined" asks for existing-vocabulary and new tags in one call.
+# "ab_eval" additionally runs the four single-purpose prompts and logs them for comparison.
+TAG_MODE = "combined"
 
 def get_new_files(db_path, directory):
     """
@@ -64,17 +57,13 @@ def prepare_files(file_path):
     return file_path , file_name , content , existing_tags
 
 
-def process_file_newfiles(file_path):
-
-    file_path = get_file_path(file_path)
-    # Extract the file name from the full file path
-    file_name = get_filename(file_path)
-    
-    # New file: read content and insert a new record.
-    content = get_file_content(file_path)
-    
-    # Generate metadata using tag_prompt and the tagging service.
-    existing_tags = tag_list()
+def run_prompt_variants(file_path, file_name, content, existing_tags):
+    """
+    A/B evaluation only: run the four single-purpose prompts the combined prompt
+    replaced and log their suggestions next to it. Costs four extra model calls.
+    """
+    from ai_service import OllamaService
+    from md_fileagent.tag_models import TagModel
 
     prompt = tag_prompt([file_name], [content], existing_tags, 3)
     old_prompt= tag_prompt_oldtags([file_name], [content], existing_tags, 3)
@@ -85,88 +74,123 @@ def process_file_newfiles(file_path):
     old_metadata_info = OllamaService(old_prompt, TagModel)
     new_metadata_info = OllamaService(new_prompt, TagModel)
     new_metadata_infov2 = OllamaService(new_promptv2, TagModel)
-    # metadata_info = OpenAIService(prompt, TagModel)
 
+    logging.info(f"A/B {file_path} tag_prompt: {tag_cleanerv2(metadata_info)}")
+    logging.info(f"A/B {file_path} tag_prompt_oldtags: {tag_cleanerv2(old_metadata_info)}")
+    logging.info(f"A/B {file_path} new_tag_prompt: {tag_cleanerv2(new_metadata_info)}")
+    logging.info(f"A/B {file_path} new_tag_promptv2: {tag_cleanerv2(new_metadata_infov2)}")
 
-    cleantags = tag_cleanerv2(metadata_info)
-    cleantagsv2 = tag_cleanerv2(old_metadata_info)
-    clean_new_metadata_info = tag_cleanerv2(new_metadata_info)
-    clean_new_metadata_infov2 = tag_cleanerv2(new_metadata_infov2)
 
+def suggest_tags(file_path, file_name, content, existing_tags):
+    """
+    Ask the model once for both tag groups written to the frontmatter:
+    tags picked from the existing vocabulary and newly suggested tags.
+    """
+    from ai_service import OllamaService
+    from md_fileagent.tag_models import CombinedTagModel
 
-    logging.info(f"Processed new file {file_path} with metadata: {cleantags}")
-    # print(f"Processed new file {file_path} with metadata: {cleantags}")
+    prompt = combined_tag_prompt([file_name], [content], existing_tags, 3)
+    metadata_info = OllamaService(prompt, CombinedTagModel)
+    # metadata_info = OpenAIService(prompt, CombinedTagModel)
 
-    logging.info(f"Processed new file {file_path} with metadata: {cleantagsv2}")
-    print(f"Processed new file {file_path} with metadata: {cleantagsv2}")
+    cleantags = tag_cleanerv2(metadata_info.existing_tags)
+    clean_new_tags = tag_cleanerv2(metadata_info.new_tags)
 
-    logging.info(f"Processed new file {file_path} with new metadata: {clean_new_metadata_info}")
-    print(f"Processed new file {file_path} with metadata: {clean_new_metadata_info}")
+    if TAG_MODE == "ab_eval":
+        logging.info(f"A/B {file_path} combined: {cleantags} | {clean_new_tags}")
+        run_prompt_variants(file_path, file_name, content, existing_tags)
 
-    logging.info(f"Processed new file {file_path} with new metadata V2: {clean_new_metadata_infov2}")
-    # print(f"Processed new file {file_path} with metadata: {clean_new_metadata_infov2}")
+    return cleantags, clean_new_tags
 
+
+def write_tags(file_path, file_name, content, cleantags, clean_new_tags):
     time = get_date_time()
     if not has_frontmatter(content):
 
         content = create_frontmatter(file_name,time , 'tagwriter' , time, content)
 
-    updated_tag = update_frontmatter(content,cleantagsv2 , clean_new_metadata_infov2 , 'tagwriter' , time)
+    updated_tag = update_frontmatter(content, cleantags, clean_new_tags, 'tagwriter', time)
     update_file(file_path , updated_tag)
 
-    # add_file_with_tags(file_path, cleantagsv2, clean_new_metadata_infov2 , time)
 
+def apply_tags(kind, file_path, file_name, content, cleantags, clean_new_tags):
+    logging.info(f"Processed {kind} file {file_path} with metadata: {cleantags}")
+    logging.info(f"Processed {kind} file {file_path} with new metadata: {clean_new_tags}")
+    print(f"Processed {kind} file {file_path} with metadata: {cleantags} | {clean_new_tags}")
 
+    write_tags(file_path, file_name, content, cleantags, clean_new_tags)
 
-def process_file_changed(file_path):
 
+def process_file_newfiles(file_path):
 
     file_path , file_name , content , existing_tags = prepare_files(file_path)
 
-    prompt = tag_prompt([file_name], [content], existing_tags, 3)
-    old_prompt= tag_prompt_oldtags([file_name], [content], existing_tags, 3)
-    new_prompt = new_tag_prompt([file_name], [content] , 3)
-    new_promptv2 = new_tag_promptv2([file_name], [content] , 3)
+    cleantags, clean_new_tags = suggest_tags(file_path, file_name, content, existing_tags)
+    apply_tags("new", file_path, file_name, content, cleantags, clean_new_tags)
 
-    metadata_info = OllamaService(prompt, TagModel)
-    old_metadata_info = OllamaService(old_prompt, TagModel)
-    new_metadata_info = OllamaService(new_prompt, TagModel)
-    new_metadata_infov2 = OllamaService(new_promptv2, TagModel)
-    # metadata_info = OpenAIService(prompt, TagModel)
+    # add_file_with_tags(file_path, cleantags, clean_new_tags , time)
 
 
-    cleantags = tag_cleanerv2(metadata_info)
-    cleantagsv2 = tag_cleanerv2(old_metadata_info)
-    clean_new_metadata_info = tag_cleanerv2(new_metadata_info)
-    clean_new_metadata_infov2 = tag_cleanerv2(new_metadata_infov2)
 
+def process_file_changed(file_path):
 
-    logging.info(f"Processed new file {file_path} with metadata: {cleantags}")
-    # print(f"Processed new file {file_path} with metadata: {cleantags}")
+    file_path , file_name , content , existing_tags = prepare_files(file_path)
 
-    logging.info(f"Processed new file {file_path} with metadata: {cleantagsv2}")
-    print(f"Processed new file {file_path} with metadata: {cleantagsv2}")
+    cleantags, clean_new_tags = suggest_tags(file_path, file_name, content, existing_tags)
+    apply_tags("changed", file_path, file_name, content, cleantags, clean_new_tags)
 
-    logging.info(f"Processed new file {file_path} with new metadata: {clean_new_metadata_info}")
-    print(f"Processed new file {file_path} with metadata: {clean_new_metadata_info}")
+    # update_file_with_tags(file_path, cleantags, clean_new_tags , time)
 
-    logging.info(f"Processed new file {file_path} with new metadata V2: {clean_new_metadata_infov2}")
-    # print(f"Processed new file {file_path} with metadata: {clean_new_metadata_infov2}")
 
-    time = get_date_time()
-    if not has_frontmatter(content):
+def prepare_and_suggest(file_path):
+    prepared = prepare_files(file_path)
+    return prepared, suggest_tags(*prepared)
 
-        content = create_frontmatter(file_name,time , 'tagwriter' , time, content)
 
-    updated_tag = update_frontmatter(content,cleantagsv2 , clean_new_metadata_infov2 , 'tagwriter' , time)
-    update_file(file_path , updated_tag)
+def process_files(file_paths, kind, scheduler):
+    """
+    Tag many notes with several model requests in flight at once.
+    Suggestions come back, and files are written, in the order of file_paths.
+    """
+    for file_path, future in scheduler.imap(prepare_and_suggest, file_paths):
+        try:
+            (file_path, file_name, content, existing_tags), (cleantags, clean_new_tags) = future.result()
+        except Exception as e:
+            logging.error(f"Failed to tag {file_path}: {e}")
+            print(f"Failed to tag {file_path}: {e}")
+            continue
+        apply_tags(kind, file_path, file_name, content, cleantags, clean_new_tags)
+
+
+def process_watched_file(file_path, created):
+    """Callback for watch mode: tag a note the watcher saw created or saved."""
+    if created:
+        process_file_newfiles(file_path)
+    else:
+        process_file_changed(file_path)
 
-    # update_file_with_tags(file_path, cleantagsv2, clean_new_metadata_infov2 , time)
+
+def watch(directory_to_scan):
+    """Tag notes as they are saved instead of polling git for changes."""
+    from md_fileagent.tag_watcher import TagWatcher
+
+    allowed_dirs = {"1. Projects", "2. Areas", "3. Resources", "4. Archives"}
+    watcher = TagWatcher(directory_to_scan, process_watched_file, allowed_dirs)
+    watcher.run()
 
 
 def main():
+    parser = argparse.ArgumentParser(description="Suggest tags for new and changed notes.")
+    parser.add_argument("--watch", action="store_true", help="Keep running and tag notes as they are saved")
+    args = parser.parse_args()
+
     db_path = "obsidian_index.db"
     directory_to_scan = "/Users/bogle/Dev/obsidian/Bogle"
+
+    if args.watch:
+        start_process()
+        watch(directory_to_scan)
+        return
     # conn = initialize_db(db_path)
     
     # check_for_ai_suggestions(db_path)
@@ -174,24 +198,34 @@ def main():
     # new_files = get_new_files(db_path, directory_to_scan)
 
 
-    #checks for any new tags and updates list
-    start_process()
-
     new_files = files_added(directory_to_scan)
+    changed_files = get_files_modified(directory_to_scan)
 
-    # Process each new file individually.
-    for file_path in new_files:
-        process_file_newfiles(file_path)
+    if not new_files and not changed_files:
+        print("Nothing to tag.")
+        return
 
-    changed_files = get_files_modified(directory_to_scan)
-    
-        # Process each new file individually.
-    for file_path in changed_files:
-        process_file_changed(file_path)
+    # Checks for any new tags and updates the list; only worth a vault scan when there is work.
+    start_process()
+
+    from ai_service import OllamaScheduler, get_response_cache
+
+    with OllamaScheduler() as scheduler:
+        process_files(new_files, "new", scheduler)
+        process_files(changed_files, "changed", scheduler)
+        print(scheduler.format_stats())
+        print(get_response_cache().format_stats())
 
-    
     print("End")
     # conn.close()
 
 if __name__ == '__main__':
+    # Set up logging to file. Only when run as a script, so importing this
+    # module doesn't write app.log into the caller's directory.
+    logging.basicConfig(
+        filename='app.log',          # Log file name
+        filemode='a',                # Append mode (use 'w' to overwrite)
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        level=logging.INFO           # Minimum log level to capture
+    )
     main()
\ No newline at end of file